@@ -1,7 +1,8 @@
 from .embedding import LocalEmbedding
 from .model import LocalRAGModel
-from .ingestion import LocalDataIngestion
+from .ingestion import LocalDataIngestion, LocalIngestionQueue
 from .vector_store import LocalVectorStore
+from .rerank import LocalReranker, LocalRerankCascade, LocalRerankerRegistry
 from .engine import LocalChatEngine
 from .prompt import get_system_prompt
 
@@ -9,7 +10,11 @@ __all__ = [
     "LocalEmbedding",
     "LocalRAGModel",
     "LocalDataIngestion",
+    "LocalIngestionQueue",
     "LocalVectorStore",
+    "LocalReranker",
+    "LocalRerankerRegistry",
+    "LocalRerankCascade",
     "LocalChatEngine",
     "get_system_prompt",
 ]
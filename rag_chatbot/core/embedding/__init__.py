@@ -1,5 +1,17 @@
+from .cache import LocalCachedEmbedding
+from .client import LocalEmbeddingClient
 from .embedding import LocalEmbedding
+from .huggingface import LocalHuggingFaceEmbedding
+from .pool import LocalEmbeddingPool
+from .registry import LocalEmbeddingRegistry
+from .server import LocalEmbeddingServer
 
 __all__ = [
     "LocalEmbedding",
+    "LocalCachedEmbedding",
+    "LocalHuggingFaceEmbedding",
+    "LocalEmbeddingPool",
+    "LocalEmbeddingRegistry",
+    "LocalEmbeddingClient",
+    "LocalEmbeddingServer",
 ]
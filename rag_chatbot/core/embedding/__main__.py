@@ -0,0 +1,43 @@
+import argparse
+from .embedding import LocalEmbedding
+from .server import LocalEmbeddingServer
+from ...setting import RAGSettings
+
+setting = RAGSettings()
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--host", type=str, default="127.0.0.1", help="Server host")
+parser.add_argument("--port", type=int, default=8001, help="Server port")
+parser.add_argument(
+    "--model",
+    type=str,
+    default=setting.ingestion.embed_llm,
+    help="Embedding model to serve",
+)
+parser.add_argument(
+    "--max_batch_size",
+    type=int,
+    default=setting.ingestion.embed_server_batch_size,
+    help="Texts per micro-batch",
+)
+parser.add_argument(
+    "--max_wait_ms",
+    type=float,
+    default=setting.ingestion.embed_server_max_wait_ms,
+    help="Time to wait for more requests before embedding a batch",
+)
+args = parser.parse_args()
+
+# The server itself embeds in-process.
+setting.ingestion.embed_server_url = ""
+server = LocalEmbeddingServer(
+    LocalEmbedding.set(setting, model_name=args.model),
+    host=args.host,
+    port=args.port,
+    max_batch_size=args.max_batch_size,
+    max_wait_ms=args.max_wait_ms,
+)
+try:
+    server.serve_forever()
+except KeyboardInterrupt:
+    server.shutdown()
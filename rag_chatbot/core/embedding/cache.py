@@ -0,0 +1,151 @@
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, List, Tuple
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from .registry import LocalEmbeddingRegistry
+
+# Shared by every LocalCachedEmbedding, keys carry the embedding model name and
+# dtype.
+_CACHE: "OrderedDict[Tuple[str, str], Embedding]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+_CACHE_STATS = {"hits": 0, "misses": 0, "miss_time": 0.0}
+# Query embeddings the shared cache holds.
+_CACHE_SIZE = 1024
+
+
+class LocalCachedEmbedding(BaseEmbedding):
+    """Wrap an embedding model with a process-wide LRU cache of query embeddings.
+
+    Queries are keyed by the embedding model name and dtype and the query
+    text with Unicode and whitespace normalized, so the same question asked
+    again, by any retriever or session, is not embedded twice. Text
+    embeddings go straight to the wrapped model. The cache size belongs to
+    the cache, not to a wrapper: ``set_cache_size`` changes it for all of
+    them. ``get_stats`` and ``format_stats`` report the hit rate and the
+    embedding time the hits saved, nothing is logged per query.
+    """
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache_name: str = PrivateAttr()
+
+    def __init__(self, embed_model: BaseEmbedding, **kwargs: Any) -> None:
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            callback_manager=embed_model.callback_manager,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        self._cache_name = LocalEmbeddingRegistry.get_name(embed_model)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalCachedEmbedding"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    @staticmethod
+    def _normalize(query: str) -> str:
+        return re.sub(r"\s+", " ", unicodedata.normalize("NFC", query)).strip()
+
+    def _lookup(self, key: Tuple[str, str]) -> Embedding | None:
+        with _CACHE_LOCK:
+            embedding = _CACHE.get(key)
+            if embedding is not None:
+                _CACHE.move_to_end(key)
+                _CACHE_STATS["hits"] += 1
+        return embedding
+
+    def _store(self, key: Tuple[str, str], embedding: Embedding, start: float) -> None:
+        with _CACHE_LOCK:
+            _CACHE_STATS["misses"] += 1
+            _CACHE_STATS["miss_time"] += time.perf_counter() - start
+            _CACHE[key] = embedding
+            _CACHE.move_to_end(key)
+            while len(_CACHE) > _CACHE_SIZE:
+                _CACHE.popitem(last=False)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        key = (self._cache_name, self._normalize(query))
+        embedding = self._lookup(key)
+        if embedding is None:
+            start = time.perf_counter()
+            embedding = self._embed_model.get_query_embedding(key[1])
+            self._store(key, embedding, start)
+        return embedding
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        key = (self._cache_name, self._normalize(query))
+        embedding = self._lookup(key)
+        if embedding is None:
+            start = time.perf_counter()
+            embedding = await self._embed_model.aget_query_embedding(key[1])
+            self._store(key, embedding, start)
+        return embedding
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed_model.get_text_embedding(text)
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return await self._embed_model.aget_text_embedding(text)
+
+    def get_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False, **kwargs: Any
+    ) -> List[Embedding]:
+        return self._embed_model.get_text_embedding_batch(
+            texts, show_progress=show_progress, **kwargs
+        )
+
+    async def aget_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False
+    ) -> List[Embedding]:
+        return await self._embed_model.aget_text_embedding_batch(
+            texts, show_progress=show_progress
+        )
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        with _CACHE_LOCK:
+            hits, misses = _CACHE_STATS["hits"], _CACHE_STATS["misses"]
+            return {
+                "size": len(_CACHE),
+                "max_size": _CACHE_SIZE,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+                # Every hit saves about one average embedding call.
+                "saved_time": hits * _CACHE_STATS["miss_time"] / misses
+                if misses > 0
+                else 0.0,
+            }
+
+    @classmethod
+    def set_cache_size(cls, size: int) -> None:
+        """Resize the shared query cache, evicting the oldest embeddings."""
+        global _CACHE_SIZE
+        if size <= 0:
+            raise ValueError(f"Query cache size {size} is not positive")
+        with _CACHE_LOCK:
+            _CACHE_SIZE = size
+            while len(_CACHE) > size:
+                _CACHE.popitem(last=False)
+
+    @classmethod
+    def format_stats(cls) -> str:
+        stats = cls.get_stats()
+        return (
+            f"hit rate {stats['hit_rate']:.1%} ({stats['hits']} of "
+            f"{stats['hits'] + stats['misses']}), saved {stats['saved_time']:.2f}s"
+        )
+
+    @classmethod
+    def clear(cls) -> None:
+        with _CACHE_LOCK:
+            _CACHE.clear()
+            _CACHE_STATS.update(hits=0, misses=0, miss_time=0.0)
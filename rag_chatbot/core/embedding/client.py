@@ -0,0 +1,49 @@
+import asyncio
+import requests
+import numpy as np
+from typing import Any, List
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field
+
+
+class LocalEmbeddingClient(BaseEmbedding):
+    """Embedding model served by a ``LocalEmbeddingServer``.
+
+    Queries and text batches are sent to ``url`` as they come, the server
+    merges them with the requests of other processes. ``model_name`` must
+    match the model the server holds.
+    """
+
+    url: str = Field(description="Embedding server URL")
+    timeout: float = Field(default=300, description="Request timeout in seconds")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalEmbeddingClient"
+
+    def embed(self, texts: List[str], kind: str = "text") -> np.ndarray:
+        """Return the embeddings of ``texts`` as a float32 matrix."""
+        response = requests.post(
+            f"{self.url.rstrip('/')}/embed",
+            json={"model": self.model_name, "kind": kind, "texts": texts},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        dim = int(response.headers["X-Embedding-Dim"])
+        return np.frombuffer(response.content, dtype=np.float32).reshape(-1, dim)
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self.embed([query], kind="query")[0].tolist()
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self.embed([text])[0].tolist()
+
+    def get_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False, **kwargs: Any
+    ) -> List[Embedding]:
+        if len(texts) == 0:
+            return []
+        return self.embed(texts).tolist()
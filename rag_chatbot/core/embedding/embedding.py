@@ -1,9 +1,14 @@
 import os
-import torch
+import functools
 import requests
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+import torch
 from llama_index.embeddings.openai import OpenAIEmbedding
-from transformers import AutoModel, AutoTokenizer
+from llama_index.core.utils import infer_torch_device
+from .cache import LocalCachedEmbedding
+from .client import LocalEmbeddingClient
+from .huggingface import LocalHuggingFaceEmbedding
+from .pool import LocalEmbeddingPool
+from .registry import LocalEmbeddingRegistry
 from ...setting import RAGSettings
 from dotenv import load_dotenv
 
@@ -12,21 +17,74 @@ load_dotenv()
 
 
 class LocalEmbedding:
+    _pools = {}
+
     @staticmethod
-    def set(setting: RAGSettings | None = None, **kwargs):
+    def set(
+        setting: RAGSettings | None = None,
+        model_name: str | None = None,
+        cache_queries: bool = False,
+        **kwargs,
+    ):
         setting = setting or RAGSettings()
-        model_name = setting.ingestion.embed_llm
+        model_name = model_name or setting.ingestion.embed_llm
+        if setting.ingestion.embed_server_url:
+            embed_model = LocalEmbeddingClient(
+                model_name=model_name,
+                url=setting.ingestion.embed_server_url,
+                embed_batch_size=setting.ingestion.embed_batch_size,
+            )
+        else:
+            embed_model = LocalEmbedding._load(setting, model_name)
+        num_processes = setting.ingestion.embed_num_processes
+        if num_processes > 1 and getattr(embed_model, "_device", None) == "cpu":
+            key = (model_name, setting.ingestion.embed_dtype, num_processes)
+            if key not in LocalEmbedding._pools:
+                LocalEmbedding._pools[key] = LocalEmbeddingPool(
+                    embed_model,
+                    load_fn=functools.partial(
+                        LocalEmbedding._load, setting, model_name
+                    ),
+                    num_workers=num_processes,
+                    num_threads=setting.ingestion.embed_num_threads,
+                )
+            embed_model = LocalEmbedding._pools[key]
+        elif (
+            setting.ingestion.embed_num_threads > 0
+            and getattr(embed_model, "_device", None) == "cpu"
+        ):
+            # Embedding in this process, the pool workers set their own.
+            torch.set_num_threads(setting.ingestion.embed_num_threads)
+        if cache_queries and setting.retriever.query_cache_size > 0:
+            LocalCachedEmbedding.set_cache_size(setting.retriever.query_cache_size)
+            return LocalCachedEmbedding(embed_model)
+        return embed_model
+
+    @staticmethod
+    def _load(setting: RAGSettings, model_name: str):
         if model_name != "text-embedding-ada-002":
-            return HuggingFaceEmbedding(
-                model=AutoModel.from_pretrained(
-                    model_name, torch_dtype=torch.float16, trust_remote_code=True
-                ),
-                tokenizer=AutoTokenizer.from_pretrained(
-                    model_name, torch_dtype=torch.float16
-                ),
+            device = setting.ingestion.embed_device
+            if device == "auto":
+                device = infer_torch_device()
+            dtype = LocalEmbeddingRegistry.resolve_dtype(
+                setting.ingestion.embed_dtype, device
+            )
+            model, tokenizer = LocalEmbeddingRegistry.get(
+                model_name,
+                dtype=dtype,
+                device=device,
+                memory_budget=setting.ingestion.embed_memory_budget,
+            )
+            return LocalHuggingFaceEmbedding(
+                model_name=model_name,
+                model=model,
+                tokenizer=tokenizer,
+                device=device,
                 cache_folder=os.path.join(os.getcwd(), setting.ingestion.cache_folder),
                 trust_remote_code=True,
                 embed_batch_size=setting.ingestion.embed_batch_size,
+                embed_batch_tokens=setting.ingestion.embed_batch_tokens,
+                dtype=dtype,
             )
         else:
             return OpenAIEmbedding()
@@ -0,0 +1,143 @@
+import os
+import threading
+import torch
+from typing import Any, Dict, List
+from llama_index.core.base.embeddings.base import Embedding
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.embeddings.huggingface.pooling import Pooling
+from llama_index.embeddings.huggingface.utils import format_query, format_text
+
+# Registry models share their tokenizer between embedding objects and threads,
+# a fast tokenizer fails when two threads call it at the same time.
+_TOKENIZER_LOCK = threading.Lock()
+
+
+def _reset_after_fork() -> None:
+    global _TOKENIZER_LOCK
+    _TOKENIZER_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class LocalHuggingFaceEmbedding(HuggingFaceEmbedding):
+    """HuggingFaceEmbedding that batches texts by token budget.
+
+    ``get_text_embedding_batch`` tokenizes all texts once, sorts them by
+    length and fills every batch with texts of similar length until the
+    padded batch would hold more than ``embed_batch_tokens`` tokens, so short
+    chunks are not padded to the longest chunk of a fixed-size batch. The
+    embeddings are returned in input order. A budget of 0 keeps the fixed
+    ``embed_batch_size`` batches.
+    """
+
+    embed_batch_tokens: int = Field(
+        default=0, description="Padded tokens per batch, 0 to batch by count", ge=0
+    )
+    dtype: str = Field(default="float32", description="Dtype the model runs in")
+
+    def __init__(
+        self, embed_batch_tokens: int = 0, dtype: str = "float32", **kwargs: Any
+    ) -> None:
+        super().__init__(**kwargs)
+        self.embed_batch_tokens = embed_batch_tokens
+        self.dtype = dtype
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalHuggingFaceEmbedding"
+
+    def _tokenize(self, sentences: List[str], **kwargs: Any) -> Dict[str, Any]:
+        with _TOKENIZER_LOCK:
+            return self._tokenizer(
+                sentences, max_length=self.max_length, truncation=True, **kwargs
+            )
+
+    def _forward(self, encoded_input: Dict[str, torch.Tensor]) -> List[List[float]]:
+        encoded_input.pop("token_type_ids", None)
+        encoded_input = {
+            key: val.to(self._device) for key, val in encoded_input.items()
+        }
+        with torch.inference_mode():
+            context_layer = self._model(**encoded_input)[0]
+            if self.pooling == Pooling.CLS:
+                embeddings = self.pooling.cls_pooling(context_layer)
+            elif self.pooling == Pooling.LAST:
+                embeddings = self.pooling.last_pooling(context_layer)
+            else:
+                embeddings = self._mean_pooling(
+                    token_embeddings=context_layer,
+                    attention_mask=encoded_input["attention_mask"],
+                )
+            if self.normalize:
+                embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+        return embeddings.float().tolist()
+
+    def _embed(self, sentences: List[str]) -> List[List[float]]:
+        return self._forward(
+            dict(self._tokenize(sentences, padding=True, return_tensors="pt"))
+        )
+
+    def get_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False, **kwargs: Any
+    ) -> List[Embedding]:
+        if self.embed_batch_tokens == 0 or len(texts) == 0:
+            return super().get_text_embedding_batch(texts, show_progress, **kwargs)
+        return self._embed_batches(
+            [
+                format_text(text, self.model_name, self.text_instruction)
+                for text in texts
+            ]
+        )
+
+    def get_query_embedding_batch(self, queries: List[str]) -> List[Embedding]:
+        """Embed several queries at once, as the embedding server does."""
+        if len(queries) == 0:
+            return []
+        queries = [
+            format_query(query, self.model_name, self.query_instruction)
+            for query in queries
+        ]
+        if self.embed_batch_tokens == 0:
+            return self._embed(queries)
+        return self._embed_batches(queries)
+
+    def _embed_batches(self, texts: List[str]) -> List[Embedding]:
+        input_ids = self._tokenize(texts)["input_ids"]
+        order = sorted(range(len(texts)), key=lambda idx: len(input_ids[idx]))
+        # Texts come in ascending length, so the last text of a batch sets
+        # its padded length.
+        batches, batch = [], []
+        for idx in order:
+            if (
+                len(batch) > 0
+                and (len(batch) + 1) * len(input_ids[idx]) > self.embed_batch_tokens
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(idx)
+        batches.append(batch)
+
+        result_embeddings: List[Embedding] = [None] * len(texts)
+        for batch in batches:
+            with self.callback_manager.event(
+                CBEventType.EMBEDDING,
+                payload={EventPayload.SERIALIZED: self.to_dict()},
+            ) as event:
+                with _TOKENIZER_LOCK:
+                    encoded_input = self._tokenizer.pad(
+                        {"input_ids": [input_ids[idx] for idx in batch]},
+                        return_tensors="pt",
+                    )
+                embeddings = self._forward(dict(encoded_input))
+                for idx, embedding in zip(batch, embeddings):
+                    result_embeddings[idx] = embedding
+                event.on_end(
+                    payload={
+                        EventPayload.CHUNKS: [texts[idx] for idx in batch],
+                        EventPayload.EMBEDDINGS: embeddings,
+                    },
+                )
+        return result_embeddings
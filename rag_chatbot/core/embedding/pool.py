@@ -0,0 +1,195 @@
+import os
+import atexit
+import threading
+import torch
+import numpy as np
+from queue import Empty
+import multiprocessing as mp
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, List
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+
+class LocalEmbeddingPool(BaseEmbedding):
+    """Embed texts in a pool of worker processes.
+
+    Every worker builds its own copy of the embedding model with
+    ``load_fn`` and runs it with ``num_threads`` intra-op threads, which
+    scales better on many cores than one process with all of them. Texts are
+    sent to the workers in batches sorted by length; each worker writes its
+    float32 embeddings into a shared-memory buffer owned by this process, so
+    no vectors are pickled on the way back. Query embeddings stay in-process
+    on the wrapped model.
+
+    Workers are forked, so the pool only works on platforms that support the
+    fork start method and with models running on CPU. A forked worker starts
+    with an empty ``LocalEmbeddingRegistry`` and loads its own model.
+    """
+
+    num_workers: int = Field(default=2, description="Worker processes", gt=0)
+    batch_size: int = Field(default=64, description="Texts per worker batch", gt=0)
+
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _dim: int = PrivateAttr()
+    _processes: list = PrivateAttr()
+    _task_queues: list = PrivateAttr()
+    _result_queue: Any = PrivateAttr()
+    _buffers: List[SharedMemory] = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr()
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        load_fn: Callable[[], BaseEmbedding],
+        num_workers: int = 2,
+        num_threads: int = 0,
+        batch_size: int = 64,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(
+            model_name=embed_model.model_name,
+            embed_batch_size=embed_model.embed_batch_size,
+            callback_manager=embed_model.callback_manager,
+            num_workers=num_workers,
+            batch_size=batch_size,
+            **kwargs,
+        )
+        self._embed_model = embed_model
+        # Taken from the config, running the model here before forking would
+        # leave the workers with a copy of its busy thread pool.
+        self._dim = embed_model._model.config.hidden_size
+        num_threads = num_threads or max(1, (os.cpu_count() or 1) // num_workers)
+        ctx = mp.get_context("fork")
+        self._result_queue = ctx.Queue()
+        self._task_queues, self._buffers, self._processes = [], [], []
+        for worker_id in range(num_workers):
+            buffer = SharedMemory(create=True, size=batch_size * self._dim * 4)
+            task_queue = ctx.Queue()
+            process = ctx.Process(
+                target=_run_worker,
+                args=(
+                    worker_id,
+                    load_fn,
+                    num_threads,
+                    buffer.name,
+                    (batch_size, self._dim),
+                    task_queue,
+                    self._result_queue,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._buffers.append(buffer)
+            self._task_queues.append(task_queue)
+            self._processes.append(process)
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalEmbeddingPool"
+
+    @property
+    def embed_model(self) -> BaseEmbedding:
+        return self._embed_model
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._embed_model.get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return await self._embed_model.aget_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._embed_model.get_text_embedding(text)
+
+    def get_text_embedding_batch(
+        self, texts: List[str], show_progress: bool = False, **kwargs: Any
+    ) -> List[Embedding]:
+        return self.embed(texts).tolist()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return the embeddings of ``texts`` as a float32 matrix."""
+        result = np.empty((len(texts), self._dim), dtype=np.float32)
+        # Similar lengths end up in the same batch, which keeps padding low.
+        order = sorted(range(len(texts)), key=lambda idx: len(texts[idx]))
+        batches = [
+            order[i : i + self.batch_size]
+            for i in range(0, len(order), self.batch_size)
+        ]
+        errors = []
+        with self._lock:
+            idle = list(range(self.num_workers))
+            running = {}
+            while len(batches) > 0 or len(running) > 0:
+                while len(batches) > 0 and len(idle) > 0 and len(errors) == 0:
+                    worker_id, batch = idle.pop(), batches.pop()
+                    running[worker_id] = batch
+                    self._task_queues[worker_id].put([texts[idx] for idx in batch])
+                if len(running) == 0:
+                    break
+                # Results of running batches are collected even after an error,
+                # so none of them is left behind for the next call.
+                worker_id, error = self._get_result()
+                batch = running.pop(worker_id)
+                idle.append(worker_id)
+                if error is not None:
+                    errors.append(f"worker {worker_id}: {error}")
+                    continue
+                output = np.ndarray(
+                    (self.batch_size, self._dim),
+                    dtype=np.float32,
+                    buffer=self._buffers[worker_id].buf,
+                )
+                result[batch] = output[: len(batch)]
+        if len(errors) > 0:
+            raise RuntimeError(f"Embedding failed in {', '.join(errors)}")
+        return result
+
+    def _get_result(self):
+        while True:
+            try:
+                return self._result_queue.get(timeout=1.0)
+            except Empty:
+                for worker_id, process in enumerate(self._processes):
+                    if not process.is_alive():
+                        raise RuntimeError(f"Embedding worker {worker_id} exited")
+
+    def close(self) -> None:
+        for task_queue, process in zip(self._task_queues, self._processes):
+            if process.is_alive():
+                task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+        for buffer in self._buffers:
+            buffer.close()
+            buffer.unlink()
+        self._processes, self._buffers = [], []
+
+
+def _run_worker(
+    worker_id: int,
+    load_fn: Callable[[], BaseEmbedding],
+    num_threads: int,
+    buffer_name: str,
+    shape: tuple,
+    task_queue,
+    result_queue,
+) -> None:
+    torch.set_num_threads(num_threads)
+    embed_model = load_fn()
+    buffer = SharedMemory(name=buffer_name)
+    output = np.ndarray(shape, dtype=np.float32, buffer=buffer.buf)
+    try:
+        while True:
+            texts = task_queue.get()
+            if texts is None:
+                return
+            try:
+                output[: len(texts)] = embed_model.get_text_embedding_batch(texts)
+                result_queue.put((worker_id, None))
+            except Exception as e:
+                result_queue.put((worker_id, repr(e)))
+    finally:
+        del output
+        buffer.close()
@@ -0,0 +1,136 @@
+import os
+import threading
+import torch
+from collections import OrderedDict
+from typing import Any, Tuple
+from transformers import AutoModel, AutoTokenizer
+
+
+class LocalEmbeddingRegistry:
+    """Process-wide cache of loaded embedding models.
+
+    Models are keyed by ``(model_name, dtype, device)`` and loaded on first
+    use, every later request for the same key shares the loaded weights and
+    tokenizer. When the loaded models take more than ``memory_budget`` MB the
+    least recently used ones are dropped from the registry; their memory is
+    freed once no embedding object holds them anymore.
+    """
+
+    _models: "OrderedDict[Tuple[str, str, str], Tuple[Any, Any, int]]" = OrderedDict()
+    _lock = threading.Lock()
+
+    DTYPES = ("float32", "bfloat16", "float16", "int8")
+
+    @staticmethod
+    def resolve_dtype(dtype: str, device: str) -> str:
+        """Pick the dtype ``auto`` stands for on ``device``.
+
+        GPUs keep half precision. On CPU float16 kernels are slow or missing,
+        so bfloat16 is used when the CPU has native support and float32
+        otherwise.
+        """
+        if dtype != "auto":
+            return dtype
+        if device != "cpu":
+            return "float16"
+        has_bf16 = getattr(torch.cpu, "_is_avx512_bf16_supported", lambda: False)()
+        has_amx = getattr(torch.cpu, "_is_amx_tile_supported", lambda: False)()
+        return "bfloat16" if has_bf16 or has_amx else "float32"
+
+    @classmethod
+    def get(
+        cls,
+        model_name: str,
+        dtype: str,
+        device: str,
+        memory_budget: int | None = None,
+    ) -> Tuple[Any, Any]:
+        """Return the ``(model, tokenizer)`` of ``model_name``.
+
+        ``dtype`` is one of float32, bfloat16, float16 or int8; int8 is a
+        float32 model whose Linear layers are dynamically quantized, it only
+        runs on CPU.
+        """
+        if dtype == "int8" and device != "cpu":
+            raise ValueError(f"int8 embedding models only run on cpu, not {device}")
+        key = (model_name, dtype, device)
+        with cls._lock:
+            if key in cls._models:
+                cls._models.move_to_end(key)
+                model, tokenizer, _ = cls._models[key]
+                return model, tokenizer
+            model = AutoModel.from_pretrained(
+                model_name,
+                torch_dtype=torch.float32 if dtype == "int8" else getattr(torch, dtype),
+                trust_remote_code=True,
+            ).to(device)
+            model.eval()
+            model.requires_grad_(False)
+            if dtype == "int8":
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            cls._models[key] = (model, tokenizer, cls._get_model_size(model))
+            if memory_budget is not None:
+                cls._evict(memory_budget * 1024 * 1024)
+            return model, tokenizer
+
+    @staticmethod
+    def get_name(embed_model: Any) -> str:
+        """Name the embeddings of ``embed_model`` are stored and cached under.
+
+        Models loaded through the registry add their dtype, embeddings of the
+        same model in float32 and int8 differ and must not be mixed.
+        """
+        name = embed_model.model_name
+        # Look through wrappers such as LocalCachedEmbedding or the worker pool.
+        while hasattr(embed_model, "embed_model"):
+            embed_model = embed_model.embed_model
+        dtype = getattr(embed_model, "dtype", None)
+        return name if dtype is None else f"{name}:{dtype}"
+
+    @classmethod
+    def split_name(cls, name: str) -> Tuple[str, str | None]:
+        """Split a name from ``get_name`` into the model name and its dtype."""
+        model_name, _, dtype = name.rpartition(":")
+        # Other names may carry a tag after a colon, such as Ollama models.
+        if model_name and dtype in cls.DTYPES:
+            return model_name, dtype
+        return name, None
+
+    @classmethod
+    def _evict(cls, memory_budget: int) -> None:
+        # The most recently used model always stays, even over budget.
+        while (
+            len(cls._models) > 1
+            and sum(size for _, _, size in cls._models.values()) > memory_budget
+        ):
+            key, _ = cls._models.popitem(last=False)
+            print(f"Unloaded embedding model {key[0]} ({key[1]}, {key[2]})")
+
+    @staticmethod
+    def _get_model_size(model: Any) -> int:
+        # Quantized Linear weights are packed outside the parameters, the
+        # state dict holds them all.
+        return sum(
+            tensor.numel() * tensor.element_size()
+            for tensor in model.state_dict().values()
+            if isinstance(tensor, torch.Tensor)
+        )
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._models.clear()
+
+
+def _reset_after_fork() -> None:
+    # A forked process must not use the parent's models, whose tokenizer may
+    # have been in use by another thread when forking, nor a lock that such a
+    # thread held.
+    LocalEmbeddingRegistry._models = OrderedDict()
+    LocalEmbeddingRegistry._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,210 @@
+import json
+import time
+import queue
+import threading
+import numpy as np
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, List, Tuple
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+
+
+class LocalEmbeddingServer:
+    """Serve one embedding model over HTTP to many pipeline processes.
+
+    Every request is queued and a single batching thread merges the requests
+    that arrive within ``max_wait_ms`` of the first one into one
+    micro-batch of up to ``max_batch_size`` texts, so concurrent pipelines
+    share the weights and fill the batches together. A request larger than
+    ``max_batch_size`` is embedded on its own.
+
+    ``POST /embed`` takes ``{"model": ..., "kind": "text" | "query",
+    "texts": [...]}`` and answers with the float32 embeddings as raw bytes,
+    one row per text, the row length in the ``X-Embedding-Dim`` header.
+    """
+
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        host: str = "127.0.0.1",
+        port: int = 8001,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self._embed_model = embed_model
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._requests: "queue.Queue[Tuple[str, List[str], Future] | None]" = (
+            queue.Queue()
+        )
+        self._stats = {"requests": 0, "batches": 0, "texts": 0}
+        self._stats_lock = threading.Lock()
+        self._batcher = threading.Thread(target=self._run_batcher, daemon=True)
+        self._batcher.start()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+
+    @property
+    def model_name(self) -> str:
+        return self._embed_model.model_name
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    @staticmethod
+    def validate(texts: Any, kind: Any) -> None:
+        """Raise ValueError unless ``texts`` is a list of str and ``kind`` valid.
+
+        Requests are checked before they are queued, one malformed request
+        must not fail the micro-batch it would share with others.
+        """
+        if kind not in ["text", "query"]:
+            raise ValueError(f"Unsupported kind {kind}")
+        if not isinstance(texts, list) or not all(
+            isinstance(text, str) for text in texts
+        ):
+            raise ValueError("texts must be a list of strings")
+
+    def embed(self, texts: List[str], kind: str = "text") -> List[Embedding]:
+        """Queue ``texts`` for the next micro-batch and wait for the result."""
+        self.validate(texts, kind)
+        if len(texts) == 0:
+            return []
+        future = Future()
+        self._requests.put((kind, texts, future))
+        return future.result()
+
+    def _run_batcher(self) -> None:
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            requests, size = [request], len(request[1])
+            deadline = time.perf_counter() + self._max_wait
+            while size < self._max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._requests.put(None)
+                    break
+                requests.append(request)
+                size += len(request[1])
+            for kind in ["text", "query"]:
+                batch = [request for request in requests if request[0] == kind]
+                if len(batch) > 0:
+                    self._run_batch(kind, batch)
+
+    def _run_batch(self, kind: str, batch: List[Tuple[str, List[str], Future]]) -> None:
+        texts = [text for _, request_texts, _ in batch for text in request_texts]
+        try:
+            if kind == "text":
+                embeddings = self._embed_model.get_text_embedding_batch(texts)
+            elif hasattr(self._embed_model, "get_query_embedding_batch"):
+                embeddings = self._embed_model.get_query_embedding_batch(texts)
+            else:
+                embeddings = [
+                    self._embed_model.get_query_embedding(text) for text in texts
+                ]
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        start = 0
+        for _, request_texts, future in batch:
+            future.set_result(embeddings[start : start + len(request_texts)])
+            start += len(request_texts)
+        with self._stats_lock:
+            self._stats["requests"] += len(batch)
+            self._stats["batches"] += 1
+            self._stats["texts"] += len(texts)
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["requests_per_batch"] = (
+            stats["requests"] / stats["batches"] if stats["batches"] > 0 else 0.0
+        )
+        return stats
+
+    def serve_forever(self) -> None:
+        host, port = self.address
+        print(f"Serving {self.model_name} on http://{host}:{port}")
+        self._server.serve_forever()
+
+    def start(self) -> None:
+        """Serve from a background thread."""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._requests.put(None)
+        self._batcher.join()
+
+
+def _make_handler(server: LocalEmbeddingServer) -> type:
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/stats":
+                self.send_error(404)
+                return
+            body = json.dumps({"model": server.model_name, **server.get_stats()})
+            self._send(200, body.encode("utf-8"), "application/json")
+
+        def do_POST(self) -> None:
+            if self.path != "/embed":
+                self.send_error(404)
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length))
+                if not isinstance(payload, dict):
+                    raise ValueError("Request body must be a JSON object")
+                if payload.get("model", server.model_name) != server.model_name:
+                    raise ValueError(
+                        f"Server embeds with {server.model_name}, "
+                        f"not {payload['model']}"
+                    )
+                texts, kind = payload["texts"], payload.get("kind", "text")
+                server.validate(texts, kind)
+            except (ValueError, KeyError) as e:
+                self.send_error(400, explain=str(e))
+                return
+            try:
+                embeddings = server.embed(texts, kind=kind)
+            except Exception as e:
+                self.send_error(500, explain=repr(e))
+                return
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            self._send(
+                200,
+                matrix.tobytes(),
+                "application/octet-stream",
+                {"X-Embedding-Dim": str(matrix.shape[1] if matrix.ndim == 2 else 0)},
+            )
+
+        def _send(
+            self,
+            code: int,
+            body: bytes,
+            content_type: str,
+            headers: dict | None = None,
+        ) -> None:
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return _Handler
@@ -1,4 +1,4 @@
 from .engine import LocalChatEngine
-from .retriever import LocalRetriever
+from .retriever import LocalBM25Retriever, LocalRetriever
 
-__all__ = ["LocalChatEngine", "LocalRetriever"]
+__all__ = ["LocalChatEngine", "LocalBM25Retriever", "LocalRetriever"]
@@ -2,18 +2,25 @@ from llama_index.core.chat_engine import CondensePlusContextChatEngine, SimpleCh
 from llama_index.core.memory import ChatMemoryBuffer
 from llama_index.core.llms.llm import LLM
 from llama_index.core.schema import BaseNode
+import numpy as np
 from typing import List
 from .retriever import LocalRetriever
+from ..vector_store import LocalVectorStore
 from ...setting import RAGSettings
 
 
 class LocalChatEngine:
     def __init__(
-        self, setting: RAGSettings | None = None, host: str = "host.docker.internal"
+        self,
+        setting: RAGSettings | None = None,
+        host: str = "host.docker.internal",
+        vector_store: LocalVectorStore | None = None,
     ):
         super().__init__()
         self._setting = setting or RAGSettings()
-        self._retriever = LocalRetriever(self._setting)
+        self._retriever = LocalRetriever(
+            self._setting, host=host, vector_store=vector_store
+        )
         self._host = host
 
     def set_engine(
@@ -21,6 +28,7 @@ class LocalChatEngine:
         llm: LLM,
         nodes: List[BaseNode],
         language: str = "eng",
+        embeddings: np.ndarray | None = None,
     ) -> CondensePlusContextChatEngine | SimpleChatEngine:
         # Normal chat engine
         if len(nodes) == 0:
@@ -33,10 +41,35 @@ class LocalChatEngine:
 
         # Chat engine with documents
         retriever = self._retriever.get_retrievers(
-            llm=llm, language=language, nodes=nodes
+            llm=llm, language=language, nodes=nodes, embeddings=embeddings
         )
         return CondensePlusContextChatEngine.from_defaults(
             retriever=retriever,
             llm=llm,
             memory=ChatMemoryBuffer(token_limit=self._setting.ollama.chat_token_limit),
         )
+
+    def set_corpus(
+        self,
+        engine: CondensePlusContextChatEngine | SimpleChatEngine,
+        llm: LLM,
+        nodes: List[BaseNode],
+        language: str = "eng",
+        embeddings: np.ndarray | None = None,
+    ) -> CondensePlusContextChatEngine | SimpleChatEngine:
+        """Point ``engine`` at ``nodes``, keeping its prompts and chat memory.
+
+        Only the retriever is rebuilt. A plain chat engine is replaced by one
+        with documents once the first ones arrive, with the same memory.
+        """
+        if len(nodes) == 0:
+            return engine
+        retriever = self._retriever.get_retrievers(
+            llm=llm, language=language, nodes=nodes, embeddings=embeddings
+        )
+        if isinstance(engine, CondensePlusContextChatEngine):
+            engine._retriever = retriever
+            return engine
+        return CondensePlusContextChatEngine.from_defaults(
+            retriever=retriever, llm=llm, memory=engine._memory
+        )
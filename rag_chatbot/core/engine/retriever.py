@@ -1,3 +1,7 @@
+import time
+import hashlib
+import threading
+import numpy as np
 from typing import List
 from dotenv import load_dotenv
 from llama_index.core.retrievers import (
@@ -8,14 +12,14 @@ from llama_index.core.retrievers import (
 )
 from llama_index.core.callbacks.base import CallbackManager
 from llama_index.core.retrievers.fusion_retriever import FUSION_MODES
-from llama_index.core.postprocessor import SentenceTransformerRerank
 from llama_index.core.tools import RetrieverTool
 from llama_index.core.selectors import LLMSingleSelector
 from llama_index.core.schema import BaseNode, NodeWithScore, QueryBundle, IndexNode
 from llama_index.core.llms.llm import LLM
-from llama_index.retrievers.bm25 import BM25Retriever
-from llama_index.core import Settings, VectorStoreIndex
+from llama_index.core import Settings
 from ..prompt import get_query_gen_prompt
+from ..rerank import LocalReranker, get_reranker
+from ..vector_store import LocalBM25Index, LocalVectorStore
 from ...setting import RAGSettings
 
 load_dotenv()
@@ -37,6 +41,8 @@ class TwoStageRetriever(QueryFusionRetriever):
         objects: List[IndexNode] | None = None,
         object_map: dict | None = None,
         retriever_weights: List[float] | None = None,
+        nodes: List[BaseNode] | None = None,
+        embeddings: np.ndarray | None = None,
     ) -> None:
         super().__init__(
             retrievers,
@@ -53,9 +59,9 @@ class TwoStageRetriever(QueryFusionRetriever):
             retriever_weights,
         )
         self._setting = setting or RAGSettings()
-        self._rerank_model = SentenceTransformerRerank(
-            top_n=self._setting.retriever.top_k_rerank,
-            model=self._setting.retriever.rerank_llm,
+        # The cross-encoder alone, or behind a cheap stage with a cascade.
+        self._rerank_model = get_reranker(
+            self._setting, nodes=nodes, embeddings=embeddings
         )
 
     def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
@@ -80,91 +86,167 @@ class TwoStageRetriever(QueryFusionRetriever):
         return self._rerank_model.postprocess_nodes(results, query_bundle)
 
 
+class LocalBM25Retriever(BaseRetriever):
+    def __init__(
+        self,
+        index: LocalBM25Index,
+        similarity_top_k: int = 10,
+        callback_manager: CallbackManager | None = None,
+        verbose: bool = False,
+    ) -> None:
+        self._index = index
+        self._similarity_top_k = similarity_top_k
+        super().__init__(callback_manager=callback_manager, verbose=verbose)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return [
+            NodeWithScore(node=node, score=score)
+            for node, score in self._index.query(
+                query_bundle.query_str, self._similarity_top_k
+            )
+        ]
+
+
 class LocalRetriever:
+    """Build the retrievers of the chat engine.
+
+    The parts that only depend on the documents, the vector index, the BM25
+    index, their retrievers and the two-stage retriever with its reranker,
+    are cached under the corpus version (a hash of the node ids), the
+    embedding model and the retriever and storage settings. An engine
+    rebuild for another LLM, language or system prompt then only creates the
+    LLM-driven fusion and router retrievers around them.
+    """
+
     def __init__(
-        self, setting: RAGSettings | None = None, host: str = "host.docker.internal"
+        self,
+        setting: RAGSettings | None = None,
+        host: str = "host.docker.internal",
+        vector_store: LocalVectorStore | None = None,
     ):
         super().__init__()
         self._setting = setting or RAGSettings()
         self._host = host
+        self._vector_store = vector_store or LocalVectorStore(
+            host=host, setting=self._setting
+        )
+        self._components_key = None
+        self._components = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _get_corpus_version(nodes: List[BaseNode]) -> str:
+        # Node ids change whenever a chunk's content or file name does.
+        hasher = hashlib.sha1()
+        for node in nodes:
+            hasher.update(node.node_id.encode("utf-8"))
+        return hasher.hexdigest()
+
+    def _get_components(
+        self,
+        nodes: List[BaseNode],
+        embeddings: np.ndarray | None = None,
+        llm: LLM | None = None,
+    ) -> dict:
+        key = (
+            self._get_corpus_version(nodes),
+            Settings.embed_model.model_name,
+            self._setting.retriever.model_dump_json(),
+            self._setting.storage.model_dump_json(),
+        )
+        with self._lock:
+            if key == self._components_key:
+                return self._components
+            if self._components_key is not None and key[0] != self._components_key[0]:
+                # Cached rerank scores belong to the previous documents.
+                LocalReranker.clear_cache()
+            start = time.perf_counter()
+            vector_index = self._vector_store.get_index(nodes, embeddings)
+            # VECTOR INDEX RETRIEVER
+            vector_retriever = VectorIndexRetriever(
+                index=vector_index,
+                similarity_top_k=self._setting.retriever.similarity_top_k,
+                embed_model=Settings.embed_model,
+                verbose=True,
+            )
+            components = {
+                "vector_index": vector_index,
+                "vector_retriever": vector_retriever,
+            }
+            if len(nodes) > self._setting.retriever.top_k_rerank:
+                bm25_retriever = LocalBM25Retriever(
+                    self._vector_store.get_bm25_index(nodes),
+                    similarity_top_k=self._setting.retriever.similarity_top_k,
+                    verbose=True,
+                )
+                components["bm25_retriever"] = bm25_retriever
+                # Never generates queries, the LLM it is built with goes unused.
+                components["two_stage_retriever"] = TwoStageRetriever(
+                    retrievers=[bm25_retriever, vector_retriever],
+                    setting=self._setting,
+                    retriever_weights=self._setting.retriever.retriever_weights,
+                    llm=llm,
+                    query_gen_prompt=None,
+                    similarity_top_k=self._setting.retriever.similarity_top_k,
+                    num_queries=1,
+                    mode=self._setting.retriever.fusion_mode,
+                    verbose=True,
+                    nodes=nodes,
+                    embeddings=embeddings,
+                )
+            self._components_key, self._components = key, components
+            print(
+                f"Built retrieval components for {len(nodes)} nodes in "
+                f"{time.perf_counter() - start:.2f}s"
+            )
+            return components
 
     def _get_normal_retriever(
         self,
-        vector_index: VectorStoreIndex,
+        components: dict,
         llm: LLM | None = None,
         language: str = "eng",
     ):
-        llm = llm or Settings.llm
-        return VectorIndexRetriever(
-            index=vector_index,
-            similarity_top_k=self._setting.retriever.similarity_top_k,
-            embed_model=Settings.embed_model,
-            verbose=True,
-        )
+        return components["vector_retriever"]
 
     def _get_hybrid_retriever(
         self,
-        vector_index: VectorStoreIndex,
+        components: dict,
         llm: LLM | None = None,
         language: str = "eng",
         gen_query: bool = True,
     ):
-        # VECTOR INDEX RETRIEVER
-        vector_retriever = VectorIndexRetriever(
-            index=vector_index,
-            similarity_top_k=self._setting.retriever.similarity_top_k,
-            embed_model=Settings.embed_model,
-            verbose=True,
-        )
+        if not gen_query:
+            return components["two_stage_retriever"]
 
-        bm25_retriever = BM25Retriever.from_defaults(
-            index=vector_index,
-            similarity_top_k=self._setting.retriever.similarity_top_k,
+        # FUSION RETRIEVER
+        return QueryFusionRetriever(
+            retrievers=[components["bm25_retriever"], components["vector_retriever"]],
+            retriever_weights=self._setting.retriever.retriever_weights,
+            llm=llm,
+            query_gen_prompt=get_query_gen_prompt(language),
+            similarity_top_k=self._setting.retriever.top_k_rerank,
+            num_queries=self._setting.retriever.num_queries,
+            mode=self._setting.retriever.fusion_mode,
             verbose=True,
         )
 
-        # FUSION RETRIEVER
-        if gen_query:
-            hybrid_retriever = QueryFusionRetriever(
-                retrievers=[bm25_retriever, vector_retriever],
-                retriever_weights=self._setting.retriever.retriever_weights,
-                llm=llm,
-                query_gen_prompt=get_query_gen_prompt(language),
-                similarity_top_k=self._setting.retriever.top_k_rerank,
-                num_queries=self._setting.retriever.num_queries,
-                mode=self._setting.retriever.fusion_mode,
-                verbose=True,
-            )
-        else:
-            hybrid_retriever = TwoStageRetriever(
-                retrievers=[bm25_retriever, vector_retriever],
-                retriever_weights=self._setting.retriever.retriever_weights,
-                llm=llm,
-                query_gen_prompt=None,
-                similarity_top_k=self._setting.retriever.similarity_top_k,
-                num_queries=1,
-                mode=self._setting.retriever.fusion_mode,
-                verbose=True,
-            )
-
-        return hybrid_retriever
-
     def _get_router_retriever(
         self,
-        vector_index: VectorStoreIndex,
+        components: dict,
         llm: LLM | None = None,
         language: str = "eng",
     ):
         fusion_tool = RetrieverTool.from_defaults(
             retriever=self._get_hybrid_retriever(
-                vector_index, llm, language, gen_query=True
+                components, llm, language, gen_query=True
             ),
             description="Use this tool when the user's query is ambiguous or unclear.",
             name="Fusion Retriever with BM25 and Vector Retriever and LLM Query Generation.",
         )
         two_stage_tool = RetrieverTool.from_defaults(
             retriever=self._get_hybrid_retriever(
-                vector_index, llm, language, gen_query=False
+                components, llm, language, gen_query=False
             ),
             description="Use this tool when the user's query is clear and unambiguous.",
             name="Two Stage Retriever with BM25 and Vector Retriever and LLM Rerank.",
@@ -181,11 +263,12 @@ class LocalRetriever:
         nodes: List[BaseNode],
         llm: LLM | None = None,
         language: str = "eng",
+        embeddings: np.ndarray | None = None,
     ):
-        vector_index = VectorStoreIndex(nodes=nodes)
+        components = self._get_components(nodes, embeddings, llm)
         if len(nodes) > self._setting.retriever.top_k_rerank:
-            retriever = self._get_router_retriever(vector_index, llm, language)
+            retriever = self._get_router_retriever(components, llm, language)
         else:
-            retriever = self._get_normal_retriever(vector_index, llm, language)
+            retriever = self._get_normal_retriever(components, llm, language)
 
         return retriever
@@ -1,5 +1,12 @@
+from .chunker import LocalTokenChunker
+from .export import LocalNodeExport
 from .ingestion import LocalDataIngestion
+from .job import IngestionJob, LocalIngestionQueue
 
 __all__ = [
     "LocalDataIngestion",
+    "LocalTokenChunker",
+    "LocalNodeExport",
+    "IngestionJob",
+    "LocalIngestionQueue",
 ]
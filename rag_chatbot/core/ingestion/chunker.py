@@ -0,0 +1,96 @@
+import re
+import numpy as np
+from typing import Any, List, Sequence, Tuple
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.node_parser import NodeParser
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.schema import BaseNode, MetadataMode
+
+
+class LocalTokenChunker(NodeParser):
+    """Split documents into chunks of at most ``chunk_size`` model tokens.
+
+    A batch of documents is tokenized in one call with the embedding model's
+    own (fast) tokenizer, chunks are then cut on the token offsets, so their
+    size is exactly what the embedding model sees and no text is tokenized
+    twice. Chunks end at the last ``chunking_regex`` match that fits the
+    window, a window without one is cut at ``chunk_size`` tokens.
+    """
+
+    chunk_size: int = Field(default=512, description="Tokens per chunk", gt=0)
+    chunk_overlap: int = Field(
+        default=32, description="Tokens shared by consecutive chunks", ge=0
+    )
+    chunking_regex: str = Field(
+        default="[^,.;。？！]+[,.;。？！]?", description="Chunk boundaries"
+    )
+
+    _tokenizer: Any = PrivateAttr()
+    _boundary_pattern: re.Pattern = PrivateAttr()
+
+    def __init__(self, tokenizer: Any, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if self.chunk_overlap >= self.chunk_size:
+            raise ValueError(
+                f"Chunk overlap ({self.chunk_overlap}) must be smaller than "
+                f"chunk size ({self.chunk_size})"
+            )
+        self._tokenizer = tokenizer
+        self._boundary_pattern = re.compile(self.chunking_regex)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalTokenChunker"
+
+    def _parse_nodes(
+        self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any
+    ) -> List[BaseNode]:
+        texts = [node.get_content(metadata_mode=MetadataMode.NONE) for node in nodes]
+        if len(texts) == 0:
+            return []
+        encodings = self._tokenizer(
+            texts,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+        all_nodes = []
+        for node, text, offsets in zip(nodes, texts, encodings["offset_mapping"]):
+            splits = [
+                text[offsets[start][0] : offsets[stop - 1][1]]
+                for start, stop in self._get_windows(text, offsets)
+            ]
+            all_nodes.extend(
+                build_nodes_from_splits(splits, node, id_func=self.id_func)
+            )
+        return all_nodes
+
+    def _get_windows(
+        self, text: str, offsets: List[Tuple[int, int]]
+    ) -> List[Tuple[int, int]]:
+        num_tokens = len(offsets)
+        if num_tokens == 0:
+            return []
+        # Number of tokens that end at or before every boundary, so a window
+        # [start, cuts[i]) ends exactly on a boundary.
+        token_ends = np.fromiter((end for _, end in offsets), np.int64, num_tokens)
+        boundaries = np.fromiter(
+            (m.end() for m in self._boundary_pattern.finditer(text)), np.int64
+        )
+        cuts = np.unique(np.searchsorted(token_ends, boundaries, side="right"))
+        windows = []
+        start = 0
+        while True:
+            stop = min(start + self.chunk_size, num_tokens)
+            if stop < num_tokens:
+                idx = np.searchsorted(cuts, stop, side="right") - 1
+                # The next window starts overlap tokens before this one ends,
+                # it has to start after this one to make progress.
+                if idx >= 0 and cuts[idx] > start + self.chunk_overlap:
+                    stop = int(cuts[idx])
+            windows.append((start, stop))
+            if stop >= num_tokens:
+                return windows
+            start = stop - self.chunk_overlap
@@ -0,0 +1,81 @@
+import os
+import json
+import numpy as np
+from typing import List, Tuple
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+
+
+class LocalNodeExport:
+    """Export format for nodes with precomputed embeddings.
+
+    An export is a directory holding ``nodes.json``, the node payloads
+    (text, metadata and relationships) with the embeddings stripped and the
+    name of the embedding model, and ``embeddings.npy``, one float32 row per
+    node in the same order. Loading memory-maps the matrix, so an index can
+    be built from an export without a single embedding call.
+    """
+
+    NODES_FILE = "nodes.json"
+    EMBEDDINGS_FILE = "embeddings.npy"
+    VERSION = 1
+
+    @classmethod
+    def exists(cls, export_dir: str) -> bool:
+        return os.path.exists(os.path.join(export_dir, cls.NODES_FILE))
+
+    @classmethod
+    def save(
+        cls,
+        export_dir: str,
+        nodes: List[BaseNode],
+        embeddings: np.ndarray,
+        embed_model: str,
+    ) -> None:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings) != len(nodes):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(nodes)} nodes")
+        payloads = []
+        for node in nodes:
+            payload = doc_to_json(node)
+            payload["__data__"]["embedding"] = None
+            payloads.append(payload)
+        os.makedirs(export_dir, exist_ok=True)
+        np.save(os.path.join(export_dir, cls.EMBEDDINGS_FILE), embeddings)
+        # Written last, an export only counts as present once it is complete.
+        with open(os.path.join(export_dir, cls.NODES_FILE), "w") as f:
+            json.dump(
+                {
+                    "version": cls.VERSION,
+                    "embed_model": embed_model,
+                    "nodes": payloads,
+                },
+                f,
+            )
+
+    @classmethod
+    def load(
+        cls, export_dir: str, embed_model: str | None = None
+    ) -> Tuple[List[BaseNode], np.ndarray, str]:
+        """Return the nodes, the read-only embeddings and the model name.
+
+        Raises ValueError when ``embed_model`` is given and the export was
+        embedded with another model.
+        """
+        with open(os.path.join(export_dir, cls.NODES_FILE), "r") as f:
+            data = json.load(f)
+        if data.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported export version {data.get('version')}")
+        if embed_model is not None and data["embed_model"] != embed_model:
+            raise ValueError(
+                f"Export was embedded with {data['embed_model']}, not {embed_model}"
+            )
+        nodes = [json_to_doc(payload) for payload in data["nodes"]]
+        embeddings = np.load(
+            os.path.join(export_dir, cls.EMBEDDINGS_FILE), mmap_mode="r"
+        )
+        if len(embeddings) != len(nodes):
+            raise ValueError(
+                f"Export has {len(embeddings)} embeddings for {len(nodes)} nodes"
+            )
+        return nodes, embeddings, data["embed_model"]
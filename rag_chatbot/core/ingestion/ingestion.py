@@ -1,92 +1,551 @@
+import os
+import copy
 import re
-import fitz
+import sys
+import json
+import uuid
+import hashlib
+import itertools
+import threading
+import numpy as np
+import multiprocessing as mp
 from llama_index.core import Document, Settings
-from llama_index.core.schema import BaseNode
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, NodeRelationship, RelatedNodeInfo
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
 from dotenv import load_dotenv
-from typing import Any, List
+from typing import Any, Callable, Iterator, List, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
+from ..embedding import LocalEmbeddingRegistry
+from .chunker import LocalTokenChunker
+from .export import LocalNodeExport
+from .node_store import LocalNodeStore
+from .reader import get_reader
+from .stage import StagedPipeline
 from ...setting import RAGSettings
 
 load_dotenv()
 
+_TEXT_PATTERN = re.compile(
+    r'[a-zA-Z0-9\u00C0-\u01B0\u1EA0-\u1EF9`~!@#$%^&*()_\-+=\[\]{}|\\;:\'",.<>/?]+'
+)
+
 
 class LocalDataIngestion:
+    NODE_FORMAT_VERSION = 3
+
     def __init__(self, setting: RAGSettings | None = None) -> None:
         self._setting = setting or RAGSettings()
         self._node_store = {}
+        self._embedding_store = {}
+        self._concatenated = ((), None)
         self._ingested_file = []
+        self._lock = threading.RLock()
+        self._batch_size = self._setting.ingestion.page_batch_size
+        self._splitter = None
+        self._splitter_name = None
+        self._persist_store = LocalNodeStore(
+            os.path.join(
+                os.getcwd(), self._setting.storage.persist_dir_storage, "nodes"
+            )
+        )
 
-    def _filter_text(self, text):
-        # Define the regex pattern.
-        pattern = r'[a-zA-Z0-9 \u00C0-\u01B0\u1EA0-\u1EF9`~!@#$%^&*()_\-+=\[\]{}|\\;:\'",.<>/?]+'
-        matches = re.findall(pattern, text)
-        # Join all matched substrings into a single string
-        filtered_text = " ".join(matches)
-        # Normalize the text by removing extra whitespaces
-        normalized_text = re.sub(r"\s+", " ", filtered_text.strip())
-
-        return normalized_text
+    @staticmethod
+    def _filter_text(text):
+        # Keep runs of allowed characters and join them with single spaces.
+        # The space is left out of the character class, so runs never contain
+        # whitespace and no separate whitespace normalization pass is needed.
+        return " ".join(_TEXT_PATTERN.findall(text))
 
     def store_nodes(
         self,
         input_files: list[str],
         embed_nodes: bool = True,
         embed_model: Any | None = None,
+        callback: Callable[[str, List[BaseNode]], None] | None = None,
+        document_ids: list[str] | None = None,
     ) -> List[BaseNode]:
-        return_nodes = []
-        self._ingested_file = []
+        """Ingest ``input_files`` and make them the current document set.
+
+        Every file becomes queryable through ``get_ingested_nodes`` as soon as
+        its nodes are ready, ``callback(input_file, nodes)`` is called at that
+        point. Files are identified by ``document_ids``, their absolute paths
+        by default; a file ingested under the id of an earlier one is a new
+        version of that document and only its new or changed chunks are
+        embedded.
+        """
+        with self._lock:
+            self._ingested_file = []
         if len(input_files) == 0:
-            return return_nodes
-        splitter = SentenceSplitter.from_defaults(
-            chunk_size=self._setting.ingestion.chunk_size,
-            chunk_overlap=self._setting.ingestion.chunk_overlap,
-            paragraph_separator=self._setting.ingestion.paragraph_sep,
-            secondary_chunking_regex=self._setting.ingestion.chunking_regex,
-        )
+            return []
+        if document_ids is None:
+            document_ids = [os.path.abspath(input_file) for input_file in input_files]
+        if len(document_ids) != len(input_files):
+            raise ValueError(
+                f"Got {len(document_ids)} document ids for {len(input_files)} files"
+            )
         if embed_nodes:
             Settings.embed_model = embed_model or Settings.embed_model
-        for input_file in tqdm(input_files, desc="Ingesting data"):
-            file_name = input_file.strip().split("/")[-1]
-            self._ingested_file.append(file_name)
-            if file_name in self._node_store:
-                return_nodes.extend(self._node_store[file_name])
-            else:
-                document = fitz.open(input_file)
-                all_text = ""
-                for doc_idx, page in enumerate(document):
-                    page_text = page.get_text("text")
-                    page_text = self._filter_text(page_text)
-                    all_text += " " + page_text
-                document = Document(
-                    text=all_text.strip(),
+            embed_model = Settings.embed_model
+        embed_name = (
+            LocalEmbeddingRegistry.get_name(embed_model) if embed_nodes else None
+        )
+        splitter, splitter_name = self._get_splitter(embed_model)
+        # A later file with the same document id replaces an earlier one as a
+        # new version of that document. Versions are resolved here, once, so
+        # only the files that end up in the document set are published.
+        input_files_of = {}
+        for input_file, document_id in zip(input_files, document_ids):
+            input_files_of.setdefault(document_id, []).append(input_file)
+        documents = {
+            document_id: (
+                files[-1],
+                self._get_node_key(files[-1], splitter_name),
+            )
+            for document_id, files in input_files_of.items()
+        }
+        node_keys = list(dict.fromkeys(key for _, key in documents.values()))
+        work_files = {}
+        for input_file, node_key in documents.values():
+            if node_key not in work_files and not self._persist_store.has(
+                node_key, embed_name
+            ):
+                work_files[node_key] = input_file
+
+        def split(item):
+            node_key, file_name, start, batch = item
+            if start is None:
+                return item
+            # Every page becomes its own document, chunks keep the page number
+            # and their character offsets inside the page.
+            documents = [
+                Document(
+                    text=page_text,
                     metadata={
                         "file_name": file_name,
+                        "page_label": str(start + idx + 1),
                     },
+                    excluded_embed_metadata_keys=["file_name", "page_label"],
                 )
+                for idx, page_text in enumerate(batch)
+                if page_text
+            ]
+            return node_key, file_name, None, splitter(documents)
 
-                nodes = splitter([document], show_progress=True)
-                if embed_nodes:
-                    nodes = Settings.embed_model(nodes, show_progress=True)
-                self._node_store[file_name] = nodes
-                return_nodes.extend(nodes)
-        return return_nodes
+        # Chunks of the previous version of an edited document keep their
+        # embeddings and ids, only new or changed chunks are embedded.
+        previous_chunks = {}
+        if embed_nodes:
+            for document_id, (_, node_key) in documents.items():
+                if node_key not in work_files or node_key in previous_chunks:
+                    continue
+                previous_key = self._persist_store.get_document(document_id)
+                if previous_key is not None and self._persist_store.has(
+                    previous_key, embed_name
+                ):
+                    previous_chunks[node_key] = {}
+                    for node, embedding in zip(
+                        self._persist_store.get(previous_key, embed_name),
+                        self._persist_store.get_embeddings(previous_key, embed_name),
+                    ):
+                        previous_chunks[node_key].setdefault(
+                            self._hash_chunk(node), []
+                        ).append((node.id_, embedding))
+        num_embedded = {}
+
+        def publish(node_key, nodes, embeddings):
+            for document_id, (input_file, key) in documents.items():
+                if key == node_key:
+                    published = self._publish(
+                        document_id, input_file, node_key, nodes, embeddings
+                    )
+                    if callback is not None:
+                        # Replaced versions are done once their document is.
+                        for document_file in input_files_of[document_id]:
+                            callback(document_file, published)
+
+        def embed(item):
+            node_key, file_name, start, batch = item
+            if embed_nodes and batch:
+                chunks = previous_chunks.get(node_key, {})
+                new_nodes = []
+                for node in batch:
+                    previous_nodes = chunks.get(self._hash_chunk(node))
+                    if previous_nodes:
+                        node.id_, embedding = previous_nodes.pop()
+                        node.embedding = embedding.tolist()
+                    else:
+                        new_nodes.append(node)
+                if len(new_nodes) > 0:
+                    Settings.embed_model(new_nodes)
+                num_embedded[node_key] = num_embedded.get(node_key, 0) + len(new_nodes)
+            return node_key, file_name, start, batch
+
+        # Parsing, splitting and embedding overlap: while one batch is
+        # embedded the next one is already being split and parsed.
+        pipeline = StagedPipeline(
+            source=self._read_batches(work_files),
+            stages=[("split", split), ("embed", embed)],
+            source_name="parse",
+            size_fn=lambda item: len(item[3] or []),
+        )
+        progress = tqdm(total=len(node_keys), desc="Ingesting data")
+        for node_key in node_keys:
+            if node_key not in work_files:
+                publish(node_key, *self._get_stored(node_key, embed_name))
+        progress.update(len(node_keys) - len(work_files))
+        pending_nodes, pending_embeddings = {}, {}
+        for node_key, file_name, start, batch in pipeline:
+            if batch is not None:
+                pending_nodes.setdefault(node_key, []).extend(batch)
+                if embed_nodes and len(batch) > 0:
+                    pending_embeddings[node_key] = self._append_embeddings(
+                        pending_embeddings.get(node_key), batch
+                    )
+                continue
+            nodes = pending_nodes.pop(node_key, [])
+            embeddings = None
+            if embed_nodes:
+                buffer, size = pending_embeddings.pop(node_key, (None, 0))
+                if buffer is None:
+                    embeddings = np.asarray([], dtype=np.float32)
+                else:
+                    # The spare rows of the buffer are not kept with the file.
+                    embeddings = buffer if size == len(buffer) else buffer[:size].copy()
+            self._persist_store.put(node_key, nodes, embed_name, embeddings)
+            publish(node_key, nodes, embeddings)
+            progress.update(1)
+            if node_key in previous_chunks:
+                print(
+                    f"Embedded {num_embedded.get(node_key, 0)} new or changed "
+                    f"of {len(nodes)} chunks in {file_name}"
+                )
+        progress.close()
+        if len(work_files) > 0:
+            for stats in pipeline.stats:
+                print(f"Ingestion {stats}")
+
+        with self._lock:
+            # Entries of previous versions are only deleted now, the files
+            # published above may still have needed them.
+            self._persist_store.set_documents(
+                {document_id: key for document_id, (_, key) in documents.items()}
+            )
+            for document_id, (input_file, node_key) in documents.items():
+                # Published above, unless the documents were reset meanwhile.
+                if document_id not in self._node_store:
+                    self._publish(
+                        document_id,
+                        input_file,
+                        node_key,
+                        *self._get_stored(node_key, embed_name),
+                    )
+            # Settle the document set in input order.
+            self._ingested_file = list(documents)
+            return self.get_ingested_nodes()
+
+    @staticmethod
+    def _append_embeddings(
+        pending: Tuple[np.ndarray, int] | None, nodes: List[BaseNode]
+    ) -> Tuple[np.ndarray, int]:
+        # Embeddings leave the nodes as soon as their batch is embedded, a
+        # file's rows are kept in one float32 buffer grown geometrically, not
+        # as lists of floats on every node until the file is done.
+        rows = np.asarray([node.embedding for node in nodes], dtype=np.float32)
+        for node in nodes:
+            node.embedding = None
+        buffer, size = pending if pending is not None else (None, 0)
+        if buffer is None or size + len(rows) > len(buffer):
+            capacity = max(size + len(rows), 2 * (0 if buffer is None else len(buffer)))
+            grown = np.empty((capacity, rows.shape[1]), dtype=np.float32)
+            if buffer is not None:
+                grown[:size] = buffer[:size]
+            buffer = grown
+        buffer[size : size + len(rows)] = rows
+        return buffer, size + len(rows)
+
+    def _get_stored(
+        self, node_key: str, embed_name: str | None
+    ) -> Tuple[List[BaseNode], np.ndarray | None]:
+        nodes = self._persist_store.get(node_key, embed_name)
+        if embed_name is None:
+            return nodes, None
+        return nodes, self._persist_store.get_embeddings(node_key, embed_name)
+
+    def _publish(
+        self,
+        document_id: str,
+        input_file: str,
+        node_key: str,
+        nodes: List[BaseNode],
+        embeddings: np.ndarray | None,
+    ) -> List[BaseNode]:
+        file_name = input_file.strip().split("/")[-1]
+        with self._lock:
+            self._node_store[document_id] = self._rename_nodes(
+                nodes, document_id, file_name
+            )
+            self._embedding_store[document_id] = embeddings
+            if document_id not in self._ingested_file:
+                self._ingested_file.append(document_id)
+            return self._node_store[document_id]
+
+    def _read_batches(self, work_files: dict) -> Iterator[Tuple]:
+        # Yields (node_key, file_name, first_page, batch) with the page texts of
+        # new files, or the stored nodes that still need this embedding model.
+        # A batch of None closes the file.
+        parse_files = {
+            node_key: input_file
+            for node_key, input_file in work_files.items()
+            if node_key not in self._persist_store
+        }
+        # Paged formats are parsed in page ranges by the worker processes, the
+        # other readers stream their sections directly.
+        page_counts = {
+            input_file: get_reader(input_file).page_count(input_file)
+            for input_file in parse_files.values()
+            if hasattr(get_reader(input_file), "read_pages")
+        }
+        page_batches = self._parse_pages(
+            [
+                (input_file, start, min(start + self._batch_size, page_count))
+                for input_file, page_count in page_counts.items()
+                for start in range(0, page_count, self._batch_size)
+            ]
+        )
+        for node_key, input_file in work_files.items():
+            file_name = input_file.strip().split("/")[-1]
+            if input_file in page_counts:
+                for start in range(0, page_counts[input_file], self._batch_size):
+                    yield node_key, file_name, start, next(page_batches)
+            elif node_key in parse_files:
+                sections = get_reader(input_file).read(input_file)
+                for start in itertools.count(0, self._batch_size):
+                    batch = [
+                        self._filter_text(section)
+                        for section in itertools.islice(sections, self._batch_size)
+                    ]
+                    if len(batch) == 0:
+                        break
+                    yield node_key, file_name, start, batch
+            else:
+                nodes = self._persist_store.get(node_key)
+                for i in range(0, len(nodes), self._batch_size):
+                    yield node_key, file_name, None, nodes[i : i + self._batch_size]
+            yield node_key, file_name, None, None
+
+    def _parse_pages(self, tasks: List[Tuple[str, int, int]]) -> Iterator[List[str]]:
+        # Text extraction is CPU bound, spread the page ranges over worker
+        # processes. Results come back in task order and only a few batches
+        # per worker are in flight, so memory does not grow with the documents.
+        num_workers = min(self._setting.ingestion.num_workers, len(tasks))
+        if num_workers <= 1:
+            yield from (_read_pages(*task) for task in tasks)
+            return
+        # Forked on Linux like the embedding pool. Elsewhere the workers are
+        # spawned and import the entry point again, which only runs as __main__.
+        mp_context = mp.get_context("fork" if sys.platform == "linux" else "spawn")
+        with ProcessPoolExecutor(
+            max_workers=num_workers, mp_context=mp_context
+        ) as executor:
+            futures = deque()
+            for task in tasks:
+                futures.append(executor.submit(_read_pages, *task))
+                if len(futures) >= 2 * num_workers:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+
+    def _get_splitter(self, embed_model: Any | None) -> Tuple[NodeParser, str]:
+        # Chunks are cut on the tokens of the embedding model when it has a
+        # fast tokenizer, the splitter is built once per tokenizer. The name
+        # tells the node keys which chunking produced the stored nodes.
+        # Look through wrappers such as LocalCachedEmbedding or the worker pool.
+        while hasattr(embed_model, "embed_model"):
+            embed_model = embed_model.embed_model
+        tokenizer = getattr(embed_model, "_tokenizer", None)
+        if not getattr(tokenizer, "is_fast", False):
+            tokenizer = None
+        splitter_name = (
+            "token:" + tokenizer.name_or_path if tokenizer is not None else "sentence"
+        )
+        with self._lock:
+            if self._splitter is None or self._splitter_name != splitter_name:
+                setting = self._setting.ingestion
+                if tokenizer is not None:
+                    # The splitter runs in its own thread next to the embedding
+                    # calls, a fast tokenizer must not be used by two threads
+                    # at once, so it gets a copy of its own.
+                    self._splitter = LocalTokenChunker(
+                        tokenizer=copy.deepcopy(tokenizer),
+                        chunk_size=min(
+                            setting.chunk_size,
+                            embed_model.max_length
+                            - tokenizer.num_special_tokens_to_add(),
+                        ),
+                        chunk_overlap=setting.chunk_overlap,
+                        chunking_regex=setting.chunking_regex,
+                    )
+                else:
+                    self._splitter = SentenceSplitter.from_defaults(
+                        chunk_size=setting.chunk_size,
+                        chunk_overlap=setting.chunk_overlap,
+                        paragraph_separator=setting.paragraph_sep,
+                        secondary_chunking_regex=setting.chunking_regex,
+                    )
+                self._splitter_name = splitter_name
+            return self._splitter, self._splitter_name
+
+    def _get_node_key(self, input_file: str, splitter_name: str) -> str:
+        # Only the settings that change how a file is chunked go into the key,
+        # embeddings are stored per model inside the entry.
+        setting = self._setting.ingestion
+        fingerprint = json.dumps(
+            [
+                self.NODE_FORMAT_VERSION,
+                splitter_name,
+                setting.chunk_size,
+                setting.chunk_overlap,
+                setting.chunking_regex,
+                setting.paragraph_sep,
+            ]
+        )
+        return hashlib.sha256(
+            (self._persist_store.hash_file(input_file) + fingerprint).encode("utf-8")
+        ).hexdigest()
+
+    @staticmethod
+    def _hash_chunk(node: BaseNode) -> str:
+        return hashlib.sha256(node.get_content().encode("utf-8")).hexdigest()
+
+    def _rename_nodes(
+        self, nodes: List[BaseNode], document_id: str, file_name: str
+    ) -> List[BaseNode]:
+        # Stored nodes are shared by every file with the same content, give
+        # them the name of the file they were uploaded as and ids stable per
+        # document, so two documents never share a node id. The document id
+        # is their source, vector stores keep their vectors apart by it.
+        renamed_nodes = []
+        for node in nodes:
+            renamed_node = node.copy()
+            renamed_node.id_ = str(
+                uuid.uuid5(uuid.NAMESPACE_URL, document_id + node.id_)
+            )
+            renamed_node.metadata = {**node.metadata, "file_name": file_name}
+            renamed_node.relationships = {
+                **node.relationships,
+                NodeRelationship.SOURCE: RelatedNodeInfo(node_id=document_id),
+            }
+            renamed_nodes.append(renamed_node)
+        return renamed_nodes
 
     def reset(self):
-        self._node_store = {}
-        self._ingested_file = []
+        with self._lock:
+            self._node_store = {}
+            self._embedding_store = {}
+            self._concatenated = ((), None)
+            self._ingested_file = []
 
     def check_nodes_exist(self):
-        return len(self._node_store.values()) > 0
+        with self._lock:
+            return len(self._node_store.values()) > 0
 
     def get_all_nodes(self):
         return_nodes = []
-        for nodes in self._node_store.values():
-            return_nodes.extend(nodes)
+        with self._lock:
+            for nodes in self._node_store.values():
+                return_nodes.extend(nodes)
         return return_nodes
 
     def get_ingested_nodes(self):
         return_nodes = []
-        for file in self._ingested_file:
-            return_nodes.extend(self._node_store[file])
+        with self._lock:
+            for document_id in self._ingested_file:
+                return_nodes.extend(self._node_store[document_id])
         return return_nodes
+
+    def get_ingested_nodes_with_embeddings(
+        self,
+    ) -> Tuple[List[BaseNode], np.ndarray | None]:
+        """Return the ingested nodes and their embeddings as one float32 matrix.
+
+        Both are read at once, so they stay aligned while a background job
+        adds files. The embeddings are None when the nodes were ingested
+        without them.
+        """
+        return_nodes = []
+        with self._lock:
+            embeddings = []
+            for document_id in self._ingested_file:
+                return_nodes.extend(self._node_store[document_id])
+                embeddings.append(self._embedding_store[document_id])
+        if len(embeddings) == 0 or any(e is None for e in embeddings):
+            return return_nodes, None
+        embeddings = [e for e in embeddings if len(e) > 0]
+        if len(embeddings) == 0:
+            return return_nodes, np.zeros((0, 0), dtype=np.float32)
+        # Engine rebuilds without new documents get the same matrix back
+        # instead of another copy.
+        key, matrix = self._concatenated
+        if len(key) != len(embeddings) or any(
+            a is not b for a, b in zip(key, embeddings)
+        ):
+            matrix = np.concatenate(embeddings)
+            self._concatenated = (tuple(embeddings), matrix)
+        return return_nodes, matrix
+
+    def export_nodes(self, export_dir: str, embed_model: Any) -> None:
+        """Write the ingested nodes and their embeddings as a ``LocalNodeExport``.
+
+        The export records the name the node store keeps the embeddings of
+        ``embed_model`` under, dtype included.
+        """
+        nodes, embeddings = self.get_ingested_nodes_with_embeddings()
+        if embeddings is None:
+            raise ValueError("Nodes were ingested without embeddings")
+        LocalNodeExport.save(
+            export_dir, nodes, embeddings, LocalEmbeddingRegistry.get_name(embed_model)
+        )
+
+    def import_nodes(
+        self, export_dir: str, embed_model: Any | None = None
+    ) -> List[BaseNode]:
+        """Replace the ingested documents with the nodes of an export.
+
+        Raises ValueError when ``embed_model`` is given and the export was not
+        embedded with it in the same dtype. The embeddings stay memory-mapped
+        from the export, nothing is embedded.
+        """
+        nodes, embeddings, _ = LocalNodeExport.load(
+            export_dir,
+            None
+            if embed_model is None
+            else LocalEmbeddingRegistry.get_name(embed_model),
+        )
+        rows = {}
+        for idx, node in enumerate(nodes):
+            # Exported nodes have their document id as source, documents
+            # sharing a file name stay apart.
+            document_id = node.ref_doc_id or node.metadata.get("file_name", "")
+            rows.setdefault(document_id, []).append(idx)
+        with self._lock:
+            self._node_store, self._embedding_store = {}, {}
+            for document_id, idxs in rows.items():
+                self._node_store[document_id] = [nodes[idx] for idx in idxs]
+                # Exports keep the rows of a document together, a slice of the
+                # memory-mapped matrix avoids copying them.
+                if idxs[-1] - idxs[0] + 1 == len(idxs):
+                    self._embedding_store[document_id] = embeddings[
+                        idxs[0] : idxs[-1] + 1
+                    ]
+                else:
+                    self._embedding_store[document_id] = embeddings[idxs]
+            self._ingested_file = list(rows.keys())
+        return self.get_ingested_nodes()
+
+
+def _read_pages(input_file: str, start: int, stop: int) -> List[str]:
+    # Runs in the ingestion worker processes, must stay importable at module level.
+    pages = get_reader(input_file).read_pages(input_file, start, stop)
+    return [LocalDataIngestion._filter_text(page) for page in pages]
@@ -0,0 +1,97 @@
+import uuid
+import threading
+import traceback
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar, Dict, List
+from llama_index.core.schema import BaseNode
+from .ingestion import LocalDataIngestion
+
+
+@dataclass
+class IngestionJob:
+    job_id: str
+    files: List[str]
+    document_ids: List[str] | None = None
+    status: Dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+    finished: bool = False
+
+    QUEUED: ClassVar[str] = "queued"
+    RUNNING: ClassVar[str] = "running"
+    DONE: ClassVar[str] = "done"
+    FAILED: ClassVar[str] = "failed"
+
+    def __post_init__(self) -> None:
+        self.status = {input_file: self.QUEUED for input_file in self.files}
+
+    @property
+    def num_done(self) -> int:
+        return sum(status == self.DONE for status in self.status.values())
+
+    @property
+    def progress(self) -> float:
+        return self.num_done / len(self.files) if len(self.files) > 0 else 1.0
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+
+class LocalIngestionQueue:
+    """Run ``LocalDataIngestion.store_nodes`` in the background.
+
+    ``submit`` returns a job id right away, the job's per-file status can then
+    be polled with ``get_job``. Files become queryable one by one as the
+    ingestion finishes them, not when the whole job is done.
+    """
+
+    def __init__(self, ingestion: LocalDataIngestion) -> None:
+        self._ingestion = ingestion
+        # Every job replaces the current document set, so jobs run one at a
+        # time in submission order.
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="ingestion"
+        )
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self, input_files: List[str], document_ids: List[str] | None = None
+    ) -> str:
+        """Queue ``input_files``, identified as in ``store_nodes``."""
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex, files=list(input_files), document_ids=document_ids
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job)
+        return job.job_id
+
+    def get_job(self, job_id: str) -> IngestionJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: IngestionJob) -> None:
+        def callback(input_file: str, nodes: List[BaseNode]) -> None:
+            job.status[input_file] = job.DONE
+
+        for input_file in job.files:
+            job.status[input_file] = job.RUNNING
+        try:
+            self._ingestion.store_nodes(
+                input_files=job.files,
+                callback=callback,
+                document_ids=job.document_ids,
+            )
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            for input_file, status in job.status.items():
+                if status != job.DONE:
+                    job.status[input_file] = job.FAILED
+        finally:
+            job.finished = True
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,209 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from typing import Dict, List, Tuple
+from llama_index.core.schema import BaseNode
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+
+
+class LocalNodeStore:
+    """Persistent, content-addressed store of ingested nodes and embeddings.
+
+    Entries are keyed by a hash of the source file content together with the
+    settings that shaped its chunks (see ``LocalDataIngestion._get_node_key``).
+    Every entry is written as ``<key>.json`` holding the node payloads with the
+    embeddings stripped, plus one float32 ``<key>.<model>.npy`` matrix per
+    embedding model, so switching the embedding model reuses the parsed nodes.
+    Embeddings are handed out as these matrices, never as lists on the nodes.
+    ``index.json`` lists the entries so the store can be opened without reading
+    any of them; entries are loaded on first access. It also remembers which
+    entry every document id was last ingested as, so a new version of a
+    document can be diffed against the previous one.
+    """
+
+    INDEX_FILE = "index.json"
+    INDEX_VERSION = 2
+
+    def __init__(self, persist_dir: str) -> None:
+        self._persist_dir = persist_dir
+        os.makedirs(self._persist_dir, exist_ok=True)
+        self._index, self._documents = self._load_index()
+        self._nodes: Dict[str, List[BaseNode]] = {}
+        self._embeddings: Dict[Tuple[str, str], np.ndarray] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def hash_file(input_file: str, block_size: int = 1 << 20) -> str:
+        hasher = hashlib.sha256()
+        with open(input_file, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                hasher.update(block)
+        return hasher.hexdigest()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._persist_dir, name)
+
+    def _load_index(self) -> Tuple[dict, dict]:
+        index = None
+        if os.path.exists(self._path(self.INDEX_FILE)):
+            try:
+                with open(self._path(self.INDEX_FILE), "r") as f:
+                    index = json.load(f)
+            except ValueError:
+                index = {}
+            if isinstance(index, dict) and index.get("version") == self.INDEX_VERSION:
+                return index["entries"], index.get("documents", {})
+        if index is None and len(os.listdir(self._persist_dir)) == 0:
+            return {}, {}
+        # A corrupt index, one written by another version or files without an
+        # index: move them aside untouched and start an empty store.
+        backup_dir = "{}.{}.bak".format(self._persist_dir, int(time.time()))
+        os.replace(self._persist_dir, backup_dir)
+        os.makedirs(self._persist_dir)
+        print(f"Moved the unreadable node store to {backup_dir}")
+        return {}, {}
+
+    def _save_index(self) -> None:
+        index_path = self._path(self.INDEX_FILE)
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(
+                {
+                    "version": self.INDEX_VERSION,
+                    "entries": self._index,
+                    "documents": self._documents,
+                },
+                f,
+            )
+        os.replace(index_path + ".tmp", index_path)
+
+    def _write(self, name: str, write_fn) -> None:
+        with open(self._path(name + ".tmp"), "wb") as f:
+            write_fn(f)
+        os.replace(self._path(name + ".tmp"), self._path(name))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def has(self, key: str, embed_model: str | None = None) -> bool:
+        entry = self._index.get(key)
+        if entry is None:
+            return False
+        return embed_model is None or embed_model in entry["embeddings"]
+
+    def keys(self) -> List[str]:
+        return list(self._index.keys())
+
+    def get(self, key: str, embed_model: str | None = None) -> List[BaseNode] | None:
+        """Return the nodes of ``key``, without their embeddings.
+
+        Returns None when the entry, or its embeddings for ``embed_model`` if
+        given, are not stored yet. Nodes asked for with an embedding model are
+        cached, the others are read fresh so the caller can change them.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            if embed_model is None:
+                return self._read_nodes(key)
+            if embed_model not in entry["embeddings"]:
+                return None
+            if key not in self._nodes:
+                self._nodes[key] = self._read_nodes(key)
+            return self._nodes[key]
+
+    def get_embeddings(self, key: str, embed_model: str) -> np.ndarray | None:
+        """Return the float32 embeddings of ``key``, one row per node.
+
+        The matrix is memory-mapped from the store and read-only.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or embed_model not in entry["embeddings"]:
+                return None
+            if (key, embed_model) not in self._embeddings:
+                self._embeddings[(key, embed_model)] = np.load(
+                    self._path(entry["embeddings"][embed_model]), mmap_mode="r"
+                )
+            return self._embeddings[(key, embed_model)]
+
+    def put(
+        self,
+        key: str,
+        nodes: List[BaseNode],
+        embed_model: str | None = None,
+        embeddings: np.ndarray | None = None,
+    ) -> None:
+        """Store ``nodes`` under ``key``, with their ``embed_model`` embeddings.
+
+        ``embeddings`` holds one row per node, it is taken from the nodes'
+        ``embedding`` when not given.
+        """
+        with self._lock:
+            if key not in self._index:
+                payloads = []
+                for node in nodes:
+                    payload = doc_to_json(node)
+                    payload["__data__"]["embedding"] = None
+                    payloads.append(payload)
+                self._write(
+                    f"{key}.json",
+                    lambda f: f.write(json.dumps(payloads).encode("utf-8")),
+                )
+                self._index[key] = {"embeddings": {}}
+            if embed_model is not None:
+                if embeddings is None:
+                    embeddings = [node.embedding for node in nodes]
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                name = "{}.{}.npy".format(
+                    key, hashlib.sha1(embed_model.encode("utf-8")).hexdigest()[:16]
+                )
+                self._write(name, lambda f: np.save(f, embeddings))
+                self._index[key]["embeddings"][embed_model] = name
+                self._embeddings[(key, embed_model)] = embeddings
+                self._nodes[key] = nodes
+            self._save_index()
+
+    def get_document(self, document_id: str) -> str | None:
+        return self._documents.get(document_id)
+
+    def set_documents(self, documents: Dict[str, str]) -> None:
+        """Record every ``document_id: key`` as the current version.
+
+        Entries of previous versions are deleted once no document points at
+        them anymore, after all of ``documents`` are recorded.
+        """
+        with self._lock:
+            previous_keys = {
+                self._documents[document_id]
+                for document_id, key in documents.items()
+                if self._documents.get(document_id) not in [None, key]
+            }
+            if len(previous_keys) == 0 and all(
+                document_id in self._documents for document_id in documents
+            ):
+                return
+            self._documents.update(documents)
+            for key in previous_keys - set(self._documents.values()):
+                self.delete(key)
+            self._save_index()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry is None:
+                return
+            for name in [f"{key}.json", *entry["embeddings"].values()]:
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            self._nodes.pop(key, None)
+            for embed_model in entry["embeddings"]:
+                self._embeddings.pop((key, embed_model), None)
+            self._save_index()
+
+    def _read_nodes(self, key: str) -> List[BaseNode]:
+        with open(self._path(f"{key}.json"), "r") as f:
+            return [json_to_doc(payload) for payload in json.load(f)]
@@ -0,0 +1,46 @@
+import os
+import importlib
+from types import ModuleType
+from typing import List
+
+# File extension -> reader module. Modules are imported the first time a file
+# of their type is ingested, so unused formats cost nothing at startup.
+# A reader module exposes ``read(input_file)`` yielding the text of one section
+# (page, block of paragraphs, rows) at a time. Paged formats also expose
+# ``page_count(input_file)`` and ``read_pages(input_file, start, stop)`` so page
+# ranges can be parsed in worker processes.
+_READERS = {
+    ".pdf": f"{__name__}.pdf",
+    ".docx": f"{__name__}.docx",
+    ".html": f"{__name__}.html",
+    ".htm": f"{__name__}.html",
+    ".md": f"{__name__}.markdown",
+    ".markdown": f"{__name__}.markdown",
+    ".txt": f"{__name__}.text",
+    ".csv": f"{__name__}.csv",
+}
+
+
+def register_reader(extension: str, module: str) -> None:
+    _READERS[extension.lower()] = module
+
+
+def get_supported_extensions() -> List[str]:
+    return list(_READERS.keys())
+
+
+def get_reader(input_file: str) -> ModuleType:
+    extension = os.path.splitext(input_file)[1].lower()
+    if extension not in _READERS:
+        raise ValueError(
+            f"Unsupported file type {extension}, "
+            f"supported types: {get_supported_extensions()}"
+        )
+    return importlib.import_module(_READERS[extension])
+
+
+__all__ = [
+    "get_reader",
+    "get_supported_extensions",
+    "register_reader",
+]
@@ -0,0 +1,19 @@
+import csv
+from typing import Iterator
+
+ROWS_PER_SECTION = 50
+
+
+def read(input_file: str) -> Iterator[str]:
+    # Sections of ROWS_PER_SECTION rows, each starting with the header row.
+    with open(input_file, "r", encoding="utf-8", errors="ignore", newline="") as f:
+        rows = csv.reader(f)
+        header = ", ".join(next(rows, []))
+        section = []
+        for row in rows:
+            section.append(", ".join(row))
+            if len(section) == ROWS_PER_SECTION:
+                yield "\n".join([header, *section])
+                section = []
+        if section:
+            yield "\n".join([header, *section])
@@ -0,0 +1,30 @@
+import zipfile
+from typing import Iterator
+from xml.etree import ElementTree
+from .text import group_blocks
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def _iter_paragraphs(input_file: str) -> Iterator[str]:
+    # Streams word/document.xml paragraph by paragraph, parsed elements are
+    # cleared right away so the whole tree is never held in memory.
+    with zipfile.ZipFile(input_file) as archive:
+        with archive.open("word/document.xml") as document:
+            for _, element in ElementTree.iterparse(document, events=("end",)):
+                if element.tag != f"{_W}p":
+                    continue
+                texts = []
+                for child in element.iter():
+                    if child.tag == f"{_W}t" and child.text:
+                        texts.append(child.text)
+                    elif child.tag == f"{_W}tab":
+                        texts.append("\t")
+                    elif child.tag in (f"{_W}br", f"{_W}cr"):
+                        texts.append("\n")
+                element.clear()
+                yield "".join(texts) + "\n"
+
+
+def read(input_file: str) -> Iterator[str]:
+    yield from group_blocks(_iter_paragraphs(input_file))
@@ -0,0 +1,60 @@
+from html.parser import HTMLParser
+from typing import Iterator, List
+from .text import group_blocks
+
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th",
+    "title", "tr", "ul",
+}  # fmt: skip
+_SKIP_TAGS = {"script", "style", "noscript", "template", "svg"}
+
+
+class _TextParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[str] = []
+        self._text: List[str] = []
+        self._skip_depth = 0
+
+    def _end_block(self) -> None:
+        if self._text:
+            self.blocks.append("".join(self._text) + "\n")
+            self._text = []
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in _BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag) -> None:
+        if tag in _SKIP_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in _BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data) -> None:
+        if self._skip_depth == 0:
+            self._text.append(data)
+
+    def close(self) -> None:
+        super().close()
+        self._end_block()
+
+
+def _iter_blocks(input_file: str, read_size: int = 1 << 16) -> Iterator[str]:
+    # Feeds the file in chunks and hands out text blocks as they complete.
+    parser = _TextParser()
+    with open(input_file, "r", encoding="utf-8", errors="ignore") as f:
+        for data in iter(lambda: f.read(read_size), ""):
+            parser.feed(data)
+            yield from parser.blocks
+            parser.blocks = []
+    parser.close()
+    yield from parser.blocks
+
+
+def read(input_file: str) -> Iterator[str]:
+    yield from group_blocks(_iter_blocks(input_file))
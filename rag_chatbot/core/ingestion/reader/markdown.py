@@ -0,0 +1,25 @@
+from typing import Iterator
+from .text import group_blocks
+
+_FENCES = ("```", "~~~")
+
+
+def read(input_file: str) -> Iterator[str]:
+    # Every heading opens a new section. Inside fenced code blocks a leading
+    # "#" is a shell or Python comment, not a heading.
+    fence = None
+
+    def is_heading(line: str) -> bool:
+        nonlocal fence
+        stripped = line.lstrip()
+        if fence is None and stripped.startswith(_FENCES):
+            fence = stripped[:3]
+            return False
+        if fence is not None:
+            if stripped.startswith(fence):
+                fence = None
+            return False
+        return line.startswith("#")
+
+    with open(input_file, "r", encoding="utf-8", errors="ignore") as f:
+        yield from group_blocks(f, is_boundary=is_heading)
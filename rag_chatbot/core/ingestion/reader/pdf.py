@@ -0,0 +1,18 @@
+import fitz
+from typing import Iterator, List
+
+
+def page_count(input_file: str) -> int:
+    with fitz.open(input_file) as document:
+        return document.page_count
+
+
+def read_pages(input_file: str, start: int, stop: int) -> List[str]:
+    with fitz.open(input_file) as document:
+        return [document[idx].get_text("text") for idx in range(start, stop)]
+
+
+def read(input_file: str) -> Iterator[str]:
+    with fitz.open(input_file) as document:
+        for page in document:
+            yield page.get_text("text")
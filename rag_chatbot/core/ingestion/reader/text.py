@@ -0,0 +1,28 @@
+from typing import Callable, Iterable, Iterator
+
+SECTION_SIZE = 4000
+
+
+def group_blocks(
+    blocks: Iterable[str],
+    section_size: int = SECTION_SIZE,
+    is_boundary: Callable[[str], bool] = lambda block: False,
+) -> Iterator[str]:
+    # Packs consecutive blocks into sections of about section_size characters.
+    # A boundary block (e.g. a heading) always starts a new section.
+    # is_boundary sees every block in order, so it may keep state.
+    section, size = [], 0
+    for block in blocks:
+        boundary = is_boundary(block)
+        if section and (size >= section_size or boundary):
+            yield "".join(section)
+            section, size = [], 0
+        section.append(block)
+        size += len(block)
+    if section:
+        yield "".join(section)
+
+
+def read(input_file: str) -> Iterator[str]:
+    with open(input_file, "r", encoding="utf-8", errors="ignore") as f:
+        yield from group_blocks(f)
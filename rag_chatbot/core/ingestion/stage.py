@@ -0,0 +1,142 @@
+import time
+import threading
+from queue import Empty, Full, Queue
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Tuple
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    busy_time: float = 0.0
+    idle_time: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.items / self.busy_time if self.busy_time > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: {self.items} items, {self.throughput:.1f} items/s, "
+            f"busy {self.busy_time:.2f}s, idle {self.idle_time:.2f}s"
+        )
+
+
+class _StageError:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+class StagedPipeline:
+    """Run a source and a chain of stages in separate threads.
+
+    Stages are connected by bounded queues, so each one works on the next item
+    while the stage after it is still busy with the current one, and no stage
+    can run more than ``queue_size`` items ahead. Items come out in source
+    order. ``stats`` reports per stage how many items it produced, its
+    throughput while busy and how long it sat idle waiting on its neighbours;
+    the bottleneck is the stage that is almost never idle.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: List[Tuple[str, Callable[[Any], Any]]],
+        source_name: str = "source",
+        queue_size: int = 4,
+        size_fn: Callable[[Any], int] = lambda item: 1,
+    ) -> None:
+        self._source = source
+        self._stages = stages
+        self._size_fn = size_fn
+        self._queues = [Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+        self._stop = threading.Event()
+        self.stats = [StageStats(source_name)] + [
+            StageStats(name) for name, _ in stages
+        ]
+
+    def _put(self, queue: Queue, item: Any, stats: StageStats) -> bool:
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                stats.idle_time += time.perf_counter() - start
+                return True
+            except Full:
+                continue
+        return False
+
+    def _get(self, queue: Queue, stats: StageStats) -> Any:
+        start = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = queue.get(timeout=0.1)
+                stats.idle_time += time.perf_counter() - start
+                return item
+            except Empty:
+                continue
+        return self._DONE
+
+    def _run_source(self) -> None:
+        stats, out_queue = self.stats[0], self._queues[0]
+        iterator = iter(self._source)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.busy_time += time.perf_counter() - start
+                stats.items += self._size_fn(item)
+                if not self._put(out_queue, item, stats):
+                    return
+        except BaseException as e:
+            self._put(out_queue, _StageError(e), stats)
+            return
+        self._put(out_queue, self._DONE, stats)
+
+    def _run_stage(self, idx: int) -> None:
+        _, fn = self._stages[idx]
+        stats = self.stats[idx + 1]
+        in_queue, out_queue = self._queues[idx], self._queues[idx + 1]
+        while True:
+            item = self._get(in_queue, stats)
+            if item is self._DONE or isinstance(item, _StageError):
+                self._put(out_queue, item, stats)
+                return
+            start = time.perf_counter()
+            try:
+                item = fn(item)
+            except BaseException as e:
+                self._put(out_queue, _StageError(e), stats)
+                return
+            stats.busy_time += time.perf_counter() - start
+            stats.items += self._size_fn(item)
+            if not self._put(out_queue, item, stats):
+                return
+
+    def __iter__(self) -> Iterator:
+        threads = [threading.Thread(target=self._run_source, daemon=True)]
+        threads += [
+            threading.Thread(target=self._run_stage, args=(idx,), daemon=True)
+            for idx in range(len(self._stages))
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = self._queues[-1].get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, _StageError):
+                    raise item.error
+                yield item
+        finally:
+            # Unblocks the stages when the consumer stops early or fails.
+            self._stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,9 @@
+from .reranker import LocalReranker, LocalRerankerRegistry
+from .cascade import LocalRerankCascade, get_reranker
+
+__all__ = [
+    "LocalReranker",
+    "LocalRerankerRegistry",
+    "LocalRerankCascade",
+    "get_reranker",
+]
@@ -0,0 +1,270 @@
+import os
+import time
+import random
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional
+from llama_index.core import Settings
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from .reranker import LocalReranker
+from ...setting import RAGSettings
+
+_CASCADE_STATS_LOCK = threading.Lock()
+_CASCADE_STATS = {
+    "queries": 0,
+    "candidates": 0,
+    "kept": 0,
+    "first_stage_s": 0.0,
+    "second_stage_s": 0.0,
+    "audited": 0,
+    "first_stage_recall": 0.0,
+    "second_stage_recall": 0.0,
+}
+
+
+def _reset_after_fork() -> None:
+    global _CASCADE_STATS_LOCK
+    _CASCADE_STATS_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class LocalRerankCascade(BaseNodePostprocessor):
+    """Rerank in two stages, a cheap one pruning candidates for a large one.
+
+    The first stage scores every candidate, either with a small cross-encoder
+    (``cross_encoder``) or by the cosine similarity of query and node
+    embeddings (``embedding``), and keeps the best ``budget`` of them, never
+    fewer than ``top_n``. Only those reach the large cross-encoder, which
+    picks the final ``top_n``. The node embeddings are the stored ones given
+    to ``set_embeddings``, only nodes missing from them are embedded again.
+
+    Each query adds its per-stage latency to ``get_stats``, nothing is
+    logged per query. A share ``audit_rate`` of the queries is also reranked
+    in full by the large model, the fraction of its ``top_n`` that survived
+    each stage gives the recall the cascade keeps. Pairs already scored come
+    from the reranker score cache, so an audit only scores the pruned
+    candidates.
+    """
+
+    model: str = Field(description="Large cross-encoder model name")
+    top_n: int = Field(default=2, description="Number of nodes to return")
+    stage: str = Field(
+        default="cross_encoder", description="First stage: cross_encoder or embedding"
+    )
+    stage_model: str = Field(
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        description="Small cross-encoder of the first stage",
+    )
+    budget: int = Field(default=12, description="Candidates kept by the first stage")
+    audit_rate: float = Field(
+        default=0.0, description="Share of queries also fully reranked", ge=0, le=1
+    )
+    device: str = Field(default="auto", description="Device, auto to infer")
+    batch_size: int = Field(default=32, description="Pairs scored per batch", gt=0)
+
+    _reranker: LocalReranker = PrivateAttr()
+    _stage_reranker: LocalReranker | None = PrivateAttr(default=None)
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _embeddings: np.ndarray | None = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if self.stage not in ["cross_encoder", "embedding"]:
+            raise ValueError(f"Unsupported rerank cascade stage {self.stage}")
+        # The large model needs at least top_n candidates to choose from.
+        self.budget = max(self.budget, self.top_n)
+        self._reranker = LocalReranker(
+            model=self.model,
+            top_n=self.top_n,
+            device=self.device,
+            batch_size=self.batch_size,
+            callback_manager=self.callback_manager,
+        )
+        if self.stage == "cross_encoder":
+            self._stage_reranker = LocalReranker(
+                model=self.stage_model,
+                top_n=self.budget,
+                device=self.device,
+                batch_size=self.batch_size,
+            )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalRerankCascade"
+
+    def set_embeddings(
+        self, nodes: List[BaseNode], embeddings: np.ndarray | None
+    ) -> None:
+        """Score the embedding stage with ``embeddings``, one row per node."""
+        if embeddings is not None and len(embeddings) != len(nodes):
+            raise ValueError(f"{len(embeddings)} embeddings for {len(nodes)} nodes")
+        self._rows = {node.node_id: row for row, node in enumerate(nodes)}
+        self._embeddings = embeddings
+
+    def _score_embeddings(self, query: str, nodes: List[NodeWithScore]) -> np.ndarray:
+        embed_model = Settings.embed_model
+        query_embedding = np.asarray(
+            embed_model.get_query_embedding(query), dtype=np.float32
+        )
+        stored = self._embeddings
+        if stored is not None and stored.shape[1] != len(query_embedding):
+            # Stored by another embedding model.
+            stored = None
+        vectors, missing = {}, []
+        for idx, node in enumerate(nodes):
+            row = self._rows.get(node.node.node_id)
+            if stored is not None and row is not None:
+                vectors[idx] = stored[row]
+            elif node.node.embedding is not None:
+                vectors[idx] = node.node.embedding
+            else:
+                missing.append(idx)
+        if len(missing) > 0:
+            embedded = embed_model.get_text_embedding_batch(
+                [
+                    nodes[idx].node.get_content(metadata_mode=MetadataMode.EMBED)
+                    for idx in missing
+                ]
+            )
+            vectors.update(zip(missing, embedded))
+        embeddings = np.asarray(
+            [vectors[idx] for idx in range(len(nodes))], dtype=np.float32
+        )
+        embeddings /= np.maximum(
+            np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12
+        )
+        return embeddings @ (
+            query_embedding / max(np.linalg.norm(query_embedding), 1e-12)
+        )
+
+    def _score_first_stage(self, query: str, nodes: List[NodeWithScore]) -> np.ndarray:
+        if self._stage_reranker is None:
+            return self._score_embeddings(query, nodes)
+        return self._stage_reranker.score(
+            query,
+            [node.node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes],
+            [node.node.node_id for node in nodes],
+        )
+
+    def _audit(
+        self,
+        query: str,
+        nodes: List[NodeWithScore],
+        kept_ids: set,
+        final_ids: set,
+    ) -> tuple:
+        scores = self._reranker.score(
+            query,
+            [node.node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes],
+            [node.node.node_id for node in nodes],
+        )
+        top = np.argsort(-scores, kind="stable")[: self.top_n]
+        full_ids = {nodes[idx].node.node_id for idx in top}
+        return (
+            len(full_ids & kept_ids) / len(full_ids),
+            len(full_ids & final_ids) / len(full_ids),
+        )
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if len(nodes) == 0:
+            return []
+
+        start = time.perf_counter()
+        candidates = nodes
+        if len(nodes) > self.budget:
+            scores = self._score_first_stage(query_bundle.query_str, nodes)
+            top = np.argsort(-scores, kind="stable")[: self.budget]
+            candidates = [nodes[idx] for idx in top]
+        first_stage_s = time.perf_counter() - start
+        start = time.perf_counter()
+        new_nodes = self._reranker.postprocess_nodes(candidates, query_bundle)
+        second_stage_s = time.perf_counter() - start
+
+        recall = None
+        if len(nodes) > self.budget and random.random() < self.audit_rate:
+            recall = self._audit(
+                query_bundle.query_str,
+                nodes,
+                {node.node.node_id for node in candidates},
+                {node.node.node_id for node in new_nodes},
+            )
+        with _CASCADE_STATS_LOCK:
+            _CASCADE_STATS["queries"] += 1
+            _CASCADE_STATS["candidates"] += len(nodes)
+            _CASCADE_STATS["kept"] += len(candidates)
+            _CASCADE_STATS["first_stage_s"] += first_stage_s
+            _CASCADE_STATS["second_stage_s"] += second_stage_s
+            if recall is not None:
+                _CASCADE_STATS["audited"] += 1
+                _CASCADE_STATS["first_stage_recall"] += recall[0]
+                _CASCADE_STATS["second_stage_recall"] += recall[1]
+        return new_nodes
+
+    @classmethod
+    def get_stats(cls) -> dict:
+        """Return mean per-query latency, candidate counts and audited recall."""
+        with _CASCADE_STATS_LOCK:
+            stats = dict(_CASCADE_STATS)
+        queries, audited = max(stats["queries"], 1), max(stats["audited"], 1)
+        return {
+            "queries": stats["queries"],
+            "mean_candidates": stats["candidates"] / queries,
+            "mean_kept": stats["kept"] / queries,
+            "first_stage_ms": 1000 * stats["first_stage_s"] / queries,
+            "second_stage_ms": 1000 * stats["second_stage_s"] / queries,
+            "audited": stats["audited"],
+            "first_stage_recall": stats["first_stage_recall"] / audited,
+            "second_stage_recall": stats["second_stage_recall"] / audited,
+        }
+
+    @classmethod
+    def clear_stats(cls) -> None:
+        with _CASCADE_STATS_LOCK:
+            for key in _CASCADE_STATS:
+                _CASCADE_STATS[key] = 0
+
+
+def get_reranker(
+    setting: RAGSettings,
+    top_n: int | None = None,
+    nodes: List[BaseNode] | None = None,
+    embeddings: np.ndarray | None = None,
+) -> LocalReranker | LocalRerankCascade:
+    """Return the reranker the retriever settings describe.
+
+    ``nodes`` and their ``embeddings`` are the stored vectors an embedding
+    first stage scores with.
+    """
+    retriever = setting.retriever
+    top_n = retriever.top_k_rerank if top_n is None else top_n
+    LocalReranker.set_cache_size(retriever.rerank_cache_size)
+    if retriever.rerank_cascade == "none":
+        return LocalReranker(
+            top_n=top_n,
+            model=retriever.rerank_llm,
+            device=retriever.rerank_device,
+            batch_size=retriever.rerank_batch_size,
+        )
+    reranker = LocalRerankCascade(
+        top_n=top_n,
+        model=retriever.rerank_llm,
+        stage=retriever.rerank_cascade,
+        stage_model=retriever.rerank_cascade_model,
+        budget=retriever.rerank_cascade_top_k,
+        audit_rate=retriever.rerank_cascade_audit_rate,
+        device=retriever.rerank_device,
+        batch_size=retriever.rerank_batch_size,
+    )
+    if nodes is not None:
+        reranker.set_embeddings(nodes, embeddings)
+    return reranker
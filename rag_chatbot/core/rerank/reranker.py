@@ -0,0 +1,210 @@
+import os
+import re
+import threading
+import unicodedata
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from sentence_transformers import CrossEncoder
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.utils import infer_torch_device
+
+DEFAULT_MAX_LENGTH = 512
+
+# Shared by every LocalReranker, keys are (model, normalized query, node id).
+_SCORE_CACHE: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+_SCORE_CACHE_LOCK = threading.Lock()
+_SCORE_CACHE_STATS = {"hits": 0, "misses": 0}
+# Pairs the shared cache holds, 0 disables it.
+_SCORE_CACHE_SIZE = 4096
+
+
+class LocalRerankerRegistry:
+    """Process-wide cross-encoders, loaded once per ``(model_name, device)``.
+
+    Every model comes with a lock held while it scores, so sessions sharing
+    it take turns instead of running the model and its fast tokenizer from
+    several threads at once.
+    """
+
+    _models: Dict[Tuple[str, str], Tuple[Any, threading.Lock]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def resolve_device(device: str) -> str:
+        return infer_torch_device() if device == "auto" else device
+
+    @classmethod
+    def get(cls, model_name: str, device: str = "auto") -> Tuple[Any, threading.Lock]:
+        key = (model_name, cls.resolve_device(device))
+        with cls._lock:
+            if key not in cls._models:
+                print(f"Loading reranker {model_name} on {key[1]}")
+                model = CrossEncoder(
+                    model_name, max_length=DEFAULT_MAX_LENGTH, device=key[1]
+                )
+                cls._models[key] = (model, threading.Lock())
+            return cls._models[key]
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._models.clear()
+
+
+def _reset_after_fork() -> None:
+    global _SCORE_CACHE_LOCK
+    LocalRerankerRegistry._models = {}
+    LocalRerankerRegistry._lock = threading.Lock()
+    _SCORE_CACHE_LOCK = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class LocalReranker(BaseNodePostprocessor):
+    """Cross-encoder reranker backed by the shared ``LocalRerankerRegistry``.
+
+    A drop-in for ``SentenceTransformerRerank``: creating one is cheap, the
+    model is loaded by the first reranker that needs it and shared by all
+    the others. Query and node pairs are scored in batches of
+    ``batch_size``.
+
+    Scores are kept in a process-wide LRU cache, keyed by the model, the
+    query with Unicode and whitespace normalized and the node id, so a
+    question asked again over the same documents only runs the cross-encoder
+    on candidates it has not scored yet. Its size belongs to the cache, not
+    to a reranker: ``set_cache_size`` changes it for every reranker and
+    ``clear_cache`` empties it when the corpus changes. ``get_cache_stats``
+    reports the hit rate, nothing is logged per query.
+    """
+
+    model: str = Field(description="Cross-encoder model name")
+    top_n: int = Field(default=2, description="Number of nodes to return")
+    device: str = Field(default="auto", description="Device, auto to infer")
+    batch_size: int = Field(default=32, description="Pairs scored per batch", gt=0)
+    keep_retrieval_score: bool = Field(
+        default=False, description="Keep the retrieval score in metadata"
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalReranker"
+
+    def _predict(self, query: str, texts: List[str]) -> np.ndarray:
+        model, lock = LocalRerankerRegistry.get(self.model, self.device)
+        with lock:
+            scores = model.predict(
+                [(query, text) for text in texts],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+            )
+        return np.asarray(scores, dtype=np.float32)
+
+    def score(
+        self, query: str, texts: List[str], node_ids: List[str] | None = None
+    ) -> np.ndarray:
+        """Return the cross-encoder score of ``query`` with every text.
+
+        With ``node_ids`` the scores are cached per node.
+        """
+        if len(texts) == 0:
+            return np.zeros(0, dtype=np.float32)
+        with _SCORE_CACHE_LOCK:
+            cache_size = _SCORE_CACHE_SIZE
+        if node_ids is None or cache_size == 0:
+            return self._predict(query, texts)
+        normalized_query = re.sub(
+            r"\s+", " ", unicodedata.normalize("NFC", query)
+        ).strip()
+        keys = [(self.model, normalized_query, node_id) for node_id in node_ids]
+        scores = np.empty(len(texts), dtype=np.float32)
+        missing = []
+        with _SCORE_CACHE_LOCK:
+            for idx, key in enumerate(keys):
+                score = _SCORE_CACHE.get(key)
+                if score is None:
+                    missing.append(idx)
+                    continue
+                _SCORE_CACHE.move_to_end(key)
+                scores[idx] = score
+            _SCORE_CACHE_STATS["hits"] += len(texts) - len(missing)
+            _SCORE_CACHE_STATS["misses"] += len(missing)
+        if len(missing) > 0:
+            scores[missing] = self._predict(query, [texts[idx] for idx in missing])
+            with _SCORE_CACHE_LOCK:
+                for idx in missing:
+                    _SCORE_CACHE[keys[idx]] = float(scores[idx])
+                    _SCORE_CACHE.move_to_end(keys[idx])
+                while len(_SCORE_CACHE) > _SCORE_CACHE_SIZE:
+                    _SCORE_CACHE.popitem(last=False)
+        return scores
+
+    @classmethod
+    def set_cache_size(cls, size: int) -> None:
+        """Resize the shared score cache, evicting the oldest pairs."""
+        global _SCORE_CACHE_SIZE
+        if size < 0:
+            raise ValueError(f"Rerank cache size {size} is negative")
+        with _SCORE_CACHE_LOCK:
+            _SCORE_CACHE_SIZE = size
+            while len(_SCORE_CACHE) > size:
+                _SCORE_CACHE.popitem(last=False)
+
+    @classmethod
+    def get_cache_stats(cls) -> dict:
+        with _SCORE_CACHE_LOCK:
+            hits, misses = _SCORE_CACHE_STATS["hits"], _SCORE_CACHE_STATS["misses"]
+            return {
+                "size": len(_SCORE_CACHE),
+                "max_size": _SCORE_CACHE_SIZE,
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses > 0 else 0.0,
+            }
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        with _SCORE_CACHE_LOCK:
+            _SCORE_CACHE.clear()
+            _SCORE_CACHE_STATS.update(hits=0, misses=0)
+
+    def _postprocess_nodes(
+        self,
+        nodes: List[NodeWithScore],
+        query_bundle: Optional[QueryBundle] = None,
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if len(nodes) == 0:
+            return []
+
+        with self.callback_manager.event(
+            CBEventType.RERANKING,
+            payload={
+                EventPayload.NODES: nodes,
+                EventPayload.MODEL_NAME: self.model,
+                EventPayload.QUERY_STR: query_bundle.query_str,
+                EventPayload.TOP_K: self.top_n,
+            },
+        ) as event:
+            scores = self.score(
+                query_bundle.query_str,
+                [
+                    node.node.get_content(metadata_mode=MetadataMode.EMBED)
+                    for node in nodes
+                ],
+                [node.node.node_id for node in nodes],
+            )
+            for node, score in zip(nodes, scores):
+                if self.keep_retrieval_score:
+                    node.node.metadata["retrieval_score"] = node.score
+                node.score = float(score)
+            new_nodes = sorted(nodes, key=lambda x: -x.score)[: self.top_n]
+            event.on_end(payload={EventPayload.NODES: new_nodes})
+
+        return new_nodes
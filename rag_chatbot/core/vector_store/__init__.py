@@ -1,5 +1,11 @@
+from .array_store import LocalArrayVectorStore
+from .bm25 import LocalBM25Index
+from .chroma_store import LocalChromaVectorStore
 from .vector_store import LocalVectorStore
 
 __all__ = [
+    "LocalArrayVectorStore",
+    "LocalBM25Index",
+    "LocalChromaVectorStore",
     "LocalVectorStore",
 ]
@@ -0,0 +1,264 @@
+import numpy as np
+from typing import Any, ClassVar, Dict, List, Tuple
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+
+class LocalArrayVectorStore(BasePydanticVectorStore):
+    """Exact-search vector store keeping all embeddings in one NumPy matrix.
+
+    Embeddings are L2-normalized and stored as ``dtype`` (float32 or float16),
+    optionally reduced to ``dim`` dimensions first, either by keeping the
+    leading ones (for Matryoshka-trained models) or by a PCA fitted on the
+    first batch added. A query, or a batch of them with ``query_batch``, is
+    scored against every row with one matrix product and the top k rows are
+    picked with ``argpartition``; float16 rows are scored in float32 blocks.
+
+    Metadata filters (``==``, ``!=``, ``in`` and ``nin``, nested with AND or
+    OR) are applied as boolean row masks, computed once per key and value
+    and kept until rows are added or deleted. The nodes themselves live in
+    the index docstore.
+    """
+
+    stores_text: bool = False
+    dtype: str = Field(default="float32", description="float32 or float16")
+    dim: int = Field(default=0, description="Stored dimensions, 0 keeps all", ge=0)
+    reduction: str = Field(default="truncate", description="truncate or pca")
+
+    BLOCK_SIZE: ClassVar[int] = 1 << 16
+
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _rows: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _doc_ids: List[str | None] = PrivateAttr(default_factory=list)
+    _metadata: List[dict] = PrivateAttr(default_factory=list)
+    _buffer: np.ndarray | None = PrivateAttr(default=None)
+    _size: int = PrivateAttr(default=0)
+    _columns: Dict[str, np.ndarray] = PrivateAttr(default_factory=dict)
+    _masks: Dict[Tuple[str, Any], np.ndarray] = PrivateAttr(default_factory=dict)
+    _mean: np.ndarray | None = PrivateAttr(default=None)
+    _components: np.ndarray | None = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        if self.dtype not in ["float32", "float16"]:
+            raise ValueError(f"Unsupported dtype {self.dtype}")
+        if self.reduction not in ["truncate", "pca"]:
+            raise ValueError(f"Unsupported reduction {self.reduction}")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalArrayVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def matrix(self) -> np.ndarray | None:
+        """The stored embeddings, one row per id."""
+        return None if self._buffer is None else self._buffer[: self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self._buffer is None else self.matrix.nbytes
+
+    def _project(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if 0 < self.dim < embeddings.shape[1]:
+            if self.reduction == "pca":
+                if self._components is None:
+                    self._fit_pca(embeddings)
+                embeddings = (embeddings - self._mean) @ self._components
+            else:
+                embeddings = embeddings[:, : self.dim]
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def _fit_pca(self, embeddings: np.ndarray) -> None:
+        self._mean = embeddings.mean(axis=0)
+        _, _, vt = np.linalg.svd(embeddings - self._mean, full_matrices=False)
+        # With fewer rows than dimensions only that many components exist.
+        self._components = np.ascontiguousarray(vt[: self.dim].T)
+
+    def add_embeddings(
+        self,
+        ids: List[str],
+        embeddings: np.ndarray,
+        doc_ids: List[str | None] | None = None,
+        metadata: List[dict] | None = None,
+    ) -> List[str]:
+        """Add one row of ``embeddings`` per id, without going through nodes."""
+        if len(ids) == 0:
+            return []
+        rows = self._project(embeddings).astype(self.dtype)
+        size = self._size + len(rows)
+        if self._buffer is None or size > len(self._buffer):
+            # Grow geometrically, adding file after file stays linear.
+            capacity = max(size, 2 * (0 if self._buffer is None else len(self._buffer)))
+            buffer = np.empty((capacity, rows.shape[1]), dtype=self.dtype)
+            if self._buffer is not None:
+                buffer[: self._size] = self.matrix
+            self._buffer = buffer
+        self._buffer[self._size : size] = rows
+        for offset, id_ in enumerate(ids):
+            self._rows[id_] = self._size + offset
+        self._size = size
+        self._ids.extend(ids)
+        self._doc_ids.extend(doc_ids or [None] * len(ids))
+        self._metadata.extend(metadata or [{}] * len(ids))
+        self._columns, self._masks = {}, {}
+        return list(ids)
+
+    def add(self, nodes: List[BaseNode], **add_kwargs: Any) -> List[str]:
+        return self.add_embeddings(
+            [node.node_id for node in nodes],
+            np.asarray([node.get_embedding() for node in nodes], dtype=np.float32),
+            [node.ref_doc_id for node in nodes],
+            [node.metadata for node in nodes],
+        )
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        keep = np.array([doc_id != ref_doc_id for doc_id in self._doc_ids], dtype=bool)
+        if keep.all():
+            return
+        matrix = self.matrix[keep]
+        self._buffer, self._size = matrix, len(matrix)
+        self._ids = [id_ for id_, k in zip(self._ids, keep) if k]
+        self._doc_ids = [doc_id for doc_id, k in zip(self._doc_ids, keep) if k]
+        self._metadata = [metadata for metadata, k in zip(self._metadata, keep) if k]
+        self._rows = {id_: row for row, id_ in enumerate(self._ids)}
+        self._columns, self._masks = {}, {}
+
+    def _get_column(self, key: str) -> np.ndarray:
+        if key not in self._columns:
+            # Filled row by row, np.array would make equal-length list values
+            # a 2-D array.
+            column = np.empty(self._size, dtype=object)
+            for row, metadata in enumerate(self._metadata):
+                column[row] = metadata.get(key)
+            self._columns[key] = column
+        return self._columns[key]
+
+    def _get_value_mask(self, key: str, value: Any) -> np.ndarray:
+        try:
+            cached = (key, value) in self._masks
+        except TypeError:
+            # Unhashable values (lists, dicts) cannot key the cache.
+            return self._compare(key, value)
+        if not cached:
+            self._masks[(key, value)] = self._compare(key, value)
+        return self._masks[(key, value)]
+
+    def _compare(self, key: str, value: Any) -> np.ndarray:
+        column = self._get_column(key)
+        if value is None or isinstance(value, (str, int, float)):
+            return column == value
+        # Sequences would broadcast against the column, compare row by row.
+        return np.fromiter(
+            (item == value for item in column), dtype=bool, count=len(column)
+        )
+
+    def _get_filter_mask(self, filters: MetadataFilters) -> np.ndarray:
+        masks = []
+        for metadata_filter in filters.filters:
+            if isinstance(metadata_filter, MetadataFilters):
+                masks.append(self._get_filter_mask(metadata_filter))
+                continue
+            masks.append(self._get_operator_mask(metadata_filter))
+        if len(masks) == 0:
+            return np.ones(self._size, dtype=bool)
+        if filters.condition == FilterCondition.OR:
+            return np.logical_or.reduce(masks)
+        return np.logical_and.reduce(masks)
+
+    def _get_operator_mask(self, metadata_filter: MetadataFilter) -> np.ndarray:
+        key, value = metadata_filter.key, metadata_filter.value
+        operator = metadata_filter.operator
+        if operator in [FilterOperator.EQ, FilterOperator.NE]:
+            mask = self._get_value_mask(key, value)
+        elif operator in [FilterOperator.IN, FilterOperator.NIN]:
+            mask = np.zeros(self._size, dtype=bool)
+            for item in value:
+                mask = mask | self._get_value_mask(key, item)
+        else:
+            raise ValueError(f"Unsupported filter operator {operator}")
+        if operator in [FilterOperator.NE, FilterOperator.NIN]:
+            return ~mask
+        return mask
+
+    def _get_mask(self, query: VectorStoreQuery) -> np.ndarray | None:
+        mask = None
+        if query.node_ids is not None or query.doc_ids is not None:
+            mask = np.zeros(self._size, dtype=bool)
+            rows = [
+                self._rows[id_] for id_ in query.node_ids or [] if id_ in self._rows
+            ]
+            mask[rows] = True
+            if query.doc_ids:
+                doc_ids = set(query.doc_ids)
+                mask |= np.array(
+                    [doc_id in doc_ids for doc_id in self._doc_ids], dtype=bool
+                )
+        if query.filters is not None:
+            filter_mask = self._get_filter_mask(query.filters)
+            mask = filter_mask if mask is None else mask & filter_mask
+        return mask
+
+    def _score(self, query_embeddings: np.ndarray) -> np.ndarray:
+        # Returns one row of scores per query.
+        matrix = self.matrix
+        if matrix.dtype == np.float32:
+            return query_embeddings @ matrix.T
+        # NumPy has no BLAS kernel for float16, convert one block at a time.
+        scores = np.empty((len(query_embeddings), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), self.BLOCK_SIZE):
+            block = matrix[start : start + self.BLOCK_SIZE].astype(np.float32)
+            scores[:, start : start + len(block)] = query_embeddings @ block.T
+        return scores
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+        top_k = min(top_k, int(np.isfinite(scores).sum()))
+        if top_k == 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        return top[np.argsort(-scores[top])]
+
+    def query_batch(
+        self, queries: List[VectorStoreQuery], **kwargs: Any
+    ) -> List[VectorStoreQueryResult]:
+        """Answer several queries, scored together with one matrix product."""
+        if len(queries) == 0:
+            return []
+        if self._size == 0:
+            return [VectorStoreQueryResult(similarities=[], ids=[]) for _ in queries]
+        scores = self._score(
+            self._project(
+                np.asarray([query.query_embedding for query in queries], np.float32)
+            )
+        )
+        results = []
+        for query, query_scores in zip(queries, scores):
+            mask = self._get_mask(query)
+            if mask is not None:
+                query_scores = np.where(mask, query_scores, -np.inf)
+            top = self._top_k(query_scores, query.similarity_top_k)
+            results.append(
+                VectorStoreQueryResult(
+                    similarities=query_scores[top].tolist(),
+                    ids=[self._ids[row] for row in top],
+                )
+            )
+        return results
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        return self.query_batch([query], **kwargs)[0]
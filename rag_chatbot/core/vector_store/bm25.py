@@ -0,0 +1,217 @@
+import os
+import json
+import threading
+import numpy as np
+from collections import Counter
+from typing import Callable, Dict, List, Tuple
+from llama_index.core.schema import BaseNode
+from llama_index.retrievers.bm25.base import tokenize_remove_stopwords
+
+
+class LocalBM25Index:
+    """Persistent BM25 inverted index over node texts.
+
+    Every node is tokenized once, when it is added; its term ids and term
+    counts are kept and saved to ``persist_dir``, so a restart or an engine
+    rebuild does not tokenize the corpus again. The postings are compact
+    CSR arrays (term offsets, document rows, term counts) rebuilt with NumPy
+    from the stored counts after nodes are added or deleted. Scores are
+    those of ``rank_bm25.BM25Okapi``, which ``BM25Retriever`` uses, with the
+    same tokenizer.
+    """
+
+    INDEX_FILE = "index.json"
+    POSTINGS_FILE = "postings.npz"
+    VERSION = 1
+
+    def __init__(
+        self,
+        persist_dir: str,
+        tokenizer: Callable[[str], List[str]] = tokenize_remove_stopwords,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ) -> None:
+        self._persist_dir = persist_dir
+        self._tokenizer = tokenizer
+        self._k1, self._b, self._epsilon = k1, b, epsilon
+        self._lock = threading.RLock()
+        self._nodes: Dict[str, BaseNode] = {}
+        self._vocabulary: Dict[str, int] = {}
+        self._node_ids: List[str] = []
+        self._doc_terms: List[np.ndarray] = []
+        self._doc_counts: List[np.ndarray] = []
+        self._doc_lengths: List[int] = []
+        self._postings = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._node_ids)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._persist_dir, name)
+
+    def _load(self) -> None:
+        if not os.path.exists(self._path(self.INDEX_FILE)):
+            return
+        with open(self._path(self.INDEX_FILE), "r") as f:
+            index = json.load(f)
+        if index.get("version") != self.VERSION:
+            return
+        self._vocabulary = {term: idx for idx, term in enumerate(index["vocabulary"])}
+        self._node_ids = index["node_ids"]
+        if len(self._node_ids) == 0:
+            return
+        postings = np.load(self._path(self.POSTINGS_FILE))
+        offsets = postings["offsets"]
+        self._doc_terms = np.split(postings["terms"], offsets[1:-1])
+        self._doc_counts = np.split(postings["counts"], offsets[1:-1])
+        self._doc_lengths = postings["lengths"].tolist()
+
+    def save(self) -> None:
+        with self._lock:
+            os.makedirs(self._persist_dir, exist_ok=True)
+            offsets = np.zeros(len(self._node_ids) + 1, dtype=np.int64)
+            np.cumsum([len(terms) for terms in self._doc_terms], out=offsets[1:])
+            with open(self._path(self.POSTINGS_FILE + ".tmp"), "wb") as f:
+                np.savez(
+                    f,
+                    terms=self._concatenate(self._doc_terms),
+                    counts=self._concatenate(self._doc_counts),
+                    offsets=offsets,
+                    lengths=np.asarray(self._doc_lengths, dtype=np.int32),
+                )
+            with open(self._path(self.INDEX_FILE + ".tmp"), "w") as f:
+                json.dump(
+                    {
+                        "version": self.VERSION,
+                        "node_ids": self._node_ids,
+                        "vocabulary": list(self._vocabulary),
+                    },
+                    f,
+                )
+            os.replace(
+                self._path(self.POSTINGS_FILE + ".tmp"), self._path(self.POSTINGS_FILE)
+            )
+            os.replace(
+                self._path(self.INDEX_FILE + ".tmp"), self._path(self.INDEX_FILE)
+            )
+
+    @staticmethod
+    def _concatenate(arrays: List[np.ndarray]) -> np.ndarray:
+        if len(arrays) == 0:
+            return np.zeros(0, dtype=np.int32)
+        return np.concatenate(arrays)
+
+    def add(self, nodes: List[BaseNode]) -> None:
+        with self._lock:
+            for node in nodes:
+                tokens = self._tokenizer(node.get_content())
+                counts = Counter(
+                    self._vocabulary.setdefault(token, len(self._vocabulary))
+                    for token in tokens
+                )
+                self._node_ids.append(node.node_id)
+                self._doc_terms.append(np.fromiter(counts.keys(), dtype=np.int32))
+                self._doc_counts.append(np.fromiter(counts.values(), dtype=np.int32))
+                self._doc_lengths.append(len(tokens))
+                self._nodes[node.node_id] = node
+            self._postings = None
+
+    def delete(self, node_ids: List[str]) -> None:
+        node_ids = set(node_ids)
+        with self._lock:
+            keep = [
+                idx for idx, id_ in enumerate(self._node_ids) if id_ not in node_ids
+            ]
+            self._node_ids = [self._node_ids[idx] for idx in keep]
+            self._doc_terms = [self._doc_terms[idx] for idx in keep]
+            self._doc_counts = [self._doc_counts[idx] for idx in keep]
+            self._doc_lengths = [self._doc_lengths[idx] for idx in keep]
+            for node_id in node_ids:
+                self._nodes.pop(node_id, None)
+            self._postings = None
+
+    def sync(self, nodes: List[BaseNode]) -> None:
+        """Make the index hold exactly ``nodes``, matched by node id.
+
+        Only nodes the index does not hold yet are tokenized. The index is
+        saved when it changed.
+        """
+        with self._lock:
+            node_ids = {node.node_id for node in nodes}
+            stale_ids = [id_ for id_ in self._node_ids if id_ not in node_ids]
+            known_ids = set(self._node_ids)
+            new_nodes = [node for node in nodes if node.node_id not in known_ids]
+            if len(stale_ids) > 0:
+                self.delete(stale_ids)
+            if len(new_nodes) > 0:
+                self.add(new_nodes)
+            # Loaded entries only have ids, the retrievers return these nodes.
+            self._nodes = {node.node_id: node for node in nodes}
+            if len(stale_ids) > 0 or len(new_nodes) > 0:
+                self.save()
+            print(
+                f"BM25 index: {len(new_nodes)} added, {len(stale_ids)} removed, "
+                f"{len(self._node_ids)} total"
+            )
+
+    def _build(self) -> Tuple[np.ndarray, ...]:
+        terms = self._concatenate(self._doc_terms)
+        counts = self._concatenate(self._doc_counts).astype(np.float32)
+        rows = np.repeat(
+            np.arange(len(self._node_ids), dtype=np.int32),
+            [len(doc_terms) for doc_terms in self._doc_terms],
+        )
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+        doc_freqs = np.bincount(terms, minlength=len(self._vocabulary))
+        np.cumsum(doc_freqs, out=offsets[1:])
+        # Inverse document frequencies as BM25Okapi computes them: over the
+        # terms present in the corpus, negative ones raised to a fraction of
+        # the average.
+        num_docs = len(self._node_ids)
+        present = doc_freqs > 0
+        idf = np.zeros(len(self._vocabulary), dtype=np.float32)
+        idf[present] = np.log(num_docs - doc_freqs[present] + 0.5) - np.log(
+            doc_freqs[present] + 0.5
+        )
+        if present.any():
+            average_idf = idf[present].mean()
+            idf[present & (idf < 0)] = self._epsilon * average_idf
+        lengths = np.asarray(self._doc_lengths, dtype=np.float32)
+        norms = self._k1 * (
+            1 - self._b + self._b * lengths / max(lengths.mean(), 1e-12)
+        )
+        return offsets, rows[order], counts[order], idf, norms
+
+    def query(self, query: str, top_k: int) -> List[Tuple[BaseNode, float]]:
+        """Return the ``top_k`` best scoring nodes with their scores."""
+        with self._lock:
+            if len(self._node_ids) == 0 or top_k <= 0:
+                return []
+            if self._postings is None:
+                self._postings = self._build()
+            offsets, rows, counts, idf, norms = self._postings
+            node_ids = self._node_ids
+            scores = np.zeros(len(node_ids), dtype=np.float32)
+            for token in self._tokenizer(query):
+                term = self._vocabulary.get(token)
+                if term is None:
+                    continue
+                start, stop = offsets[term], offsets[term + 1]
+                term_rows, term_counts = rows[start:stop], counts[start:stop]
+                scores[term_rows] += (
+                    idf[term]
+                    * term_counts
+                    * (self._k1 + 1)
+                    / (term_counts + norms[term_rows])
+                )
+            top_k = min(top_k, len(scores))
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (self._nodes[node_ids[row]], float(scores[row]))
+                for row in top
+                if node_ids[row] in self._nodes
+            ]
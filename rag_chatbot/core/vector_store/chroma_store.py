@@ -0,0 +1,51 @@
+import dataclasses
+from typing import Any, List
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+
+class LocalChromaVectorStore(ChromaVectorStore):
+    """Chroma vector store restricted to the vectors of ``document_ids``.
+
+    A persistent collection is shared by every process using the same
+    embedding model, an app and an evaluation may hold different documents in
+    it. Queries only search the vectors whose ``ref_doc_id`` is one of
+    ``document_ids`` and ``get_ids`` only lists those, so nobody sees or
+    deletes the vectors of documents they did not pass.
+    """
+
+    _document_ids: List[str] = PrivateAttr(default_factory=list)
+
+    def __init__(self, document_ids: List[str], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._document_ids = list(document_ids)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LocalChromaVectorStore"
+
+    def get_ids(self) -> List[str]:
+        """Return the ids of the stored vectors of ``document_ids``."""
+        return self.client.get(
+            where={"ref_doc_id": {"$in": self._document_ids}}, include=[]
+        )["ids"]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        document_filter = MetadataFilter(
+            key="ref_doc_id", value=self._document_ids, operator=FilterOperator.IN
+        )
+        if query.filters is None:
+            filters = MetadataFilters(filters=[document_filter])
+        elif query.filters.condition in (None, FilterCondition.AND):
+            filters = MetadataFilters(filters=[*query.filters.filters, document_filter])
+        else:
+            raise ValueError("Only AND metadata filters are supported")
+        return super().query(dataclasses.replace(query, filters=filters), **kwargs)
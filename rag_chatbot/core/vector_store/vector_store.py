@@ -1,22 +1,185 @@
-from llama_index.core import VectorStoreIndex
+import os
+import hashlib
+import threading
+import numpy as np
+from typing import Any, Dict, List
+from llama_index.core import Settings, StorageContext, VectorStoreIndex
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.core.vector_stores.utils import node_to_metadata_dict
+from llama_index.vector_stores.chroma import ChromaVectorStore
 from dotenv import load_dotenv
+from ..embedding import LocalEmbeddingRegistry
+from .array_store import LocalArrayVectorStore
+from .bm25 import LocalBM25Index
+from .chroma_store import LocalChromaVectorStore
 from ...setting import RAGSettings
 
 load_dotenv()
 
 
 class LocalVectorStore:
+    """Build the vector index the retrievers search.
+
+    With the ``chroma`` backend the embeddings live in a persistent Chroma
+    collection per embedding model, searched through its HNSW index. The
+    collection is shared with every process using it, so ``get_index`` only
+    touches the documents of the nodes it is passed: nodes the collection does
+    not hold yet are added, older versions of those documents are deleted and
+    queries are filtered to them. An engine rebuild after a model, language or
+    prompt change touches nothing and a restart reuses the index on disk. The
+    ``array`` backend builds an exact in-memory ``LocalArrayVectorStore``
+    instead.
+    """
+
+    ADD_BATCH_SIZE = 4096
+    # Part of the collection name, bumped when the stored layout changes.
+    COLLECTION_VERSION = 2
+
     def __init__(
         self,
         host: str = "host.docker.internal",
         setting: RAGSettings | None = None,
     ) -> None:
-        # TODO
-        # CHROMA VECTOR STORE
         self._setting = setting or RAGSettings()
+        self._host = host
+        self._collections: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._bm25_index = None
 
-    def get_index(self, nodes):
+    def get_index(
+        self, nodes: List[BaseNode], embeddings: np.ndarray | None = None
+    ) -> VectorStoreIndex | None:
+        """Return an index of ``nodes``.
+
+        ``embeddings`` holds one row per node. Without it the nodes' own
+        embeddings are used, and nodes that have none are embedded.
+        """
         if len(nodes) == 0:
             return None
-        index = VectorStoreIndex(nodes=nodes)
+        if self._setting.storage.vector_store == "array":
+            return self._get_array_index(nodes, embeddings)
+        if self._setting.storage.vector_store == "chroma":
+            return self._get_chroma_index(nodes, embeddings)
+        raise ValueError(
+            f"Unsupported vector store {self._setting.storage.vector_store}"
+        )
+
+    def get_bm25_index(self, nodes: List[BaseNode]) -> LocalBM25Index:
+        """Return the BM25 index, synced to ``nodes``.
+
+        The index is saved next to the node store and shared by every
+        retriever built from this vector store.
+        """
+        with self._lock:
+            if self._bm25_index is None:
+                self._bm25_index = LocalBM25Index(
+                    os.path.join(
+                        os.getcwd(), self._setting.storage.persist_dir_storage, "bm25"
+                    )
+                )
+        self._bm25_index.sync(nodes)
+        return self._bm25_index
+
+    def _get_array_index(
+        self, nodes: List[BaseNode], embeddings: np.ndarray | None
+    ) -> VectorStoreIndex:
+        vector_store = LocalArrayVectorStore(
+            dtype=self._setting.storage.vector_dtype,
+            dim=self._setting.storage.vector_dim,
+            reduction=self._setting.storage.vector_reduction,
+        )
+        index = VectorStoreIndex(
+            nodes=[],
+            storage_context=StorageContext.from_defaults(vector_store=vector_store),
+        )
+        if embeddings is None:
+            index.insert_nodes(nodes)
+            return index
+        # Precomputed embeddings go straight into the matrix, the nodes never
+        # carry them as lists.
+        vector_store.add_embeddings(
+            [node.node_id for node in nodes],
+            embeddings,
+            [node.ref_doc_id for node in nodes],
+            [node.metadata for node in nodes],
+        )
+        for node in nodes:
+            index.index_struct.add_node(node, text_id=node.node_id)
+        index.docstore.add_documents(nodes, allow_update=True)
+        index.storage_context.index_store.add_index_struct(index.index_struct)
         return index
+
+    def _get_collection(self, embed_name: str) -> Any:
+        if embed_name not in self._collections:
+            # One collection per embedding model, their dimensions differ.
+            name = "{}_{}".format(
+                self._setting.storage.collection_name,
+                hashlib.sha1(
+                    f"{self.COLLECTION_VERSION}:{embed_name}".encode("utf-8")
+                ).hexdigest()[:16],
+            )
+            self._collections[embed_name] = ChromaVectorStore.from_params(
+                collection_name=name,
+                persist_dir=os.path.join(
+                    os.getcwd(), self._setting.storage.persist_dir_chroma
+                ),
+                collection_kwargs={"metadata": {"hnsw:space": "cosine"}},
+            ).client
+        return self._collections[embed_name]
+
+    def _get_chroma_index(
+        self, nodes: List[BaseNode], embeddings: np.ndarray | None
+    ) -> VectorStoreIndex:
+        embed_model = Settings.embed_model
+        document_ids = list(dict.fromkeys(node.ref_doc_id or "None" for node in nodes))
+        with self._lock:
+            collection = self._get_collection(
+                LocalEmbeddingRegistry.get_name(embed_model)
+            )
+            vector_store = LocalChromaVectorStore(
+                document_ids=document_ids, chroma_collection=collection
+            )
+            # Read on every call, other processes write to the same collection.
+            ids = set(vector_store.get_ids())
+            node_ids = {node.node_id for node in nodes}
+            # Only older versions of the passed documents are deleted.
+            stale_ids = [id_ for id_ in ids if id_ not in node_ids]
+            for start in range(0, len(stale_ids), self.ADD_BATCH_SIZE):
+                collection.delete(ids=stale_ids[start : start + self.ADD_BATCH_SIZE])
+            new_rows = [
+                idx for idx, node in enumerate(nodes) if node.node_id not in ids
+            ]
+            for start in range(0, len(new_rows), self.ADD_BATCH_SIZE):
+                rows = new_rows[start : start + self.ADD_BATCH_SIZE]
+                batch = [nodes[idx] for idx in rows]
+                if embeddings is not None:
+                    vectors = np.asarray(embeddings[rows], dtype=np.float32).tolist()
+                elif all(node.embedding is not None for node in batch):
+                    vectors = [node.embedding for node in batch]
+                else:
+                    vectors = embed_model.get_text_embedding_batch(
+                        [
+                            node.get_content(metadata_mode=MetadataMode.EMBED)
+                            for node in batch
+                        ]
+                    )
+                collection.upsert(
+                    ids=[node.node_id for node in batch],
+                    embeddings=vectors,
+                    metadatas=[self._get_metadata(node) for node in batch],
+                    documents=[
+                        node.get_content(metadata_mode=MetadataMode.NONE)
+                        for node in batch
+                    ],
+                )
+            print(
+                f"Vector index: {len(new_rows)} added, {len(stale_ids)} removed, "
+                f"{len(node_ids)} total"
+            )
+        return VectorStoreIndex.from_vector_store(vector_store, embed_model=embed_model)
+
+    @staticmethod
+    def _get_metadata(node: BaseNode) -> dict:
+        metadata = node_to_metadata_dict(node, remove_text=True, flat_metadata=True)
+        # Chroma rejects None metadata values.
+        return {key: "" if value is None else value for key, value in metadata.items()}
@@ -6,8 +6,6 @@ from dotenv import load_dotenv
 from tqdm.asyncio import tqdm_asyncio
 from llama_index.core import VectorStoreIndex, Settings
 from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.retrievers.bm25 import BM25Retriever
-from llama_index.core.postprocessor import SentenceTransformerRerank
 from llama_index.core.evaluation import (
     RetrieverEvaluator,
     FaithfulnessEvaluator,
@@ -16,8 +14,12 @@ from llama_index.core.evaluation import (
 )
 from llama_index.core.evaluation import EmbeddingQAFinetuneDataset
 from llama_index.core.storage.docstore import DocumentStore
-from ..core.engine import LocalChatEngine, LocalRetriever
+from ..core.embedding import LocalEmbedding, LocalEmbeddingRegistry
+from ..core.engine import LocalBM25Retriever, LocalChatEngine, LocalRetriever
+from ..core.ingestion import LocalNodeExport
 from ..core.model import LocalRAGModel
+from ..core.rerank import get_reranker
+from ..core.vector_store import LocalVectorStore
 from ..setting import RAGSettings
 from ..ollama import is_port_open, run_ollama_server
 
@@ -32,6 +34,7 @@ class RAGPipelineEvaluator:
         host: str = "host.docker.internal",
         dataset_path: str = "val_dataset/dataset.json",
         docstore_path: str = "val_dataset/docstore.json",
+        export_dir: str | None = "val_dataset",
     ) -> None:
         self._setting = RAGSettings()
         if llm not in ["gpt-3.5-turbo", "gpt-4", "gpt-4o", "gpt-4-turbo"]:
@@ -40,34 +43,56 @@ class RAGPipelineEvaluator:
             print("Pulling complete")
         self._llm = LocalRAGModel.set(model_name=llm, host=host)
         self._teacher = LocalRAGModel.set(model_name=teacher, host=host)
-        self._engine = LocalChatEngine(host=host)
+        # One vector store for the engine and every retriever evaluated.
+        vector_store = LocalVectorStore(host=host, setting=self._setting)
+        self._engine = LocalChatEngine(
+            self._setting, host=host, vector_store=vector_store
+        )
         Settings.llm = self._llm
         # Settings.embed_model = LocalEmbedding.set()
 
         # dataset
-        docstore = DocumentStore.from_persist_path(docstore_path)
-        nodes = list(docstore.docs.values())
-        self._index = VectorStoreIndex(nodes=nodes)
+        embeddings = None
+        if export_dir is not None and LocalNodeExport.exists(export_dir):
+            # Precomputed embeddings, the queries are embedded with the same model.
+            nodes, embeddings, embed_name = LocalNodeExport.load(export_dir)
+            model_name, dtype = LocalEmbeddingRegistry.split_name(embed_name)
+            if dtype is not None:
+                self._setting.ingestion.embed_dtype = dtype
+            Settings.embed_model = LocalEmbedding.set(
+                self._setting, model_name=model_name
+            )
+            if LocalEmbeddingRegistry.get_name(Settings.embed_model) != embed_name:
+                raise ValueError(
+                    f"Export was embedded with {embed_name}, not "
+                    f"{LocalEmbeddingRegistry.get_name(Settings.embed_model)}"
+                )
+            self._index = vector_store.get_index(nodes, embeddings)
+        else:
+            docstore = DocumentStore.from_persist_path(docstore_path)
+            nodes = list(docstore.docs.values())
+            self._index = VectorStoreIndex(nodes=nodes)
         self._dataset = EmbeddingQAFinetuneDataset.from_json(dataset_path)
         self._top_k = self._setting.retriever.similarity_top_k
         self._top_k_rerank = self._setting.retriever.top_k_rerank
+        bm25_index = vector_store.get_bm25_index(nodes)
 
         self._retriever = {
             "base": VectorIndexRetriever(
                 index=self._index, similarity_top_k=self._top_k_rerank, verbose=True
             ),
-            "bm25": BM25Retriever.from_defaults(
-                index=self._index, similarity_top_k=self._top_k_rerank, verbose=True
+            "bm25": LocalBM25Retriever(
+                bm25_index, similarity_top_k=self._top_k_rerank, verbose=True
             ),
             "base_rerank": VectorIndexRetriever(
                 index=self._index, similarity_top_k=self._top_k, verbose=True
             ),
-            "bm25_rerank": BM25Retriever.from_defaults(
-                index=self._index, similarity_top_k=self._top_k, verbose=True
-            ),
-            "router": LocalRetriever(host=host).get_retrievers(
-                llm=self._llm, nodes=nodes
+            "bm25_rerank": LocalBM25Retriever(
+                bm25_index, similarity_top_k=self._top_k, verbose=True
             ),
+            "router": LocalRetriever(
+                self._setting, host=host, vector_store=vector_store
+            ).get_retrievers(llm=self._llm, nodes=nodes, embeddings=embeddings),
         }
 
         self._retriever_evaluator = {
@@ -81,9 +106,11 @@ class RAGPipelineEvaluator:
                 ["mrr", "hit_rate"],
                 retriever=self._retriever["base_rerank"],
                 node_postprocessors=[
-                    SentenceTransformerRerank(
+                    get_reranker(
+                        self._setting,
                         top_n=self._top_k_rerank,
-                        model=self._setting.retriever.rerank_llm,
+                        nodes=nodes,
+                        embeddings=embeddings,
                     )
                 ],
             ),
@@ -91,9 +118,11 @@ class RAGPipelineEvaluator:
                 ["mrr", "hit_rate"],
                 retriever=self._retriever["bm25_rerank"],
                 node_postprocessors=[
-                    SentenceTransformerRerank(
+                    get_reranker(
+                        self._setting,
                         top_n=self._top_k_rerank,
-                        model=self._setting.retriever.rerank_llm,
+                        nodes=nodes,
+                        embeddings=embeddings,
                     )
                 ],
             ),
@@ -246,6 +275,12 @@ if __name__ == "__main__":
         default="harry_potter_dataset/docstore.json",
         help="Set docstore path",
     )
+    parser.add_argument(
+        "--export",
+        type=str,
+        default="harry_potter_dataset",
+        help="Set node export directory, used instead of the docstore if present",
+    )
     args = parser.parse_args()
     if args.host != "host.docker.internal":
         port_number = 11434
@@ -262,6 +297,7 @@ if __name__ == "__main__":
         host=args.host,
         dataset_path=args.dataset,
         docstore_path=args.docstore,
+        export_dir=args.export,
     )
 
     async def eval_retriever():
@@ -0,0 +1,324 @@
+import re
+import time
+import random
+import argparse
+import numpy as np
+import torch
+from typing import Callable, List, Tuple
+from llama_index.core import Document
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.vector_stores import SimpleVectorStore, VectorStoreQuery
+from llama_index.core.vector_stores.simple import SimpleVectorStoreData
+from transformers import AutoTokenizer
+from ..core.embedding import LocalEmbedding
+from ..core.ingestion import LocalDataIngestion, LocalTokenChunker
+from ..core.ingestion.reader import get_reader
+from ..core.vector_store import LocalArrayVectorStore
+from ..setting import RAGSettings
+
+
+def _legacy_filter_text(text: str) -> str:
+    # The three-pass filter LocalDataIngestion used before, kept as a baseline.
+    pattern = (
+        r'[a-zA-Z0-9 \u00C0-\u01B0\u1EA0-\u1EF9`~!@#$%^&*()_\-+=\[\]{}|\\;:\'",.<>/?]+'
+    )
+    matches = re.findall(pattern, text)
+    filtered_text = " ".join(matches)
+    return re.sub(r"\s+", " ", filtered_text.strip())
+
+
+def _load_pages(input_files: List[str], num_pages: int) -> List[str]:
+    pages = []
+    for input_file in input_files:
+        pages.extend(get_reader(input_file).read(input_file))
+    if len(pages) == 0:
+        # No corpus given, build pages from a mix of English, Vietnamese,
+        # whitespace runs and characters the filter drops.
+        words = [
+            "retrieval", "augmented", "generation,", "Tiếng", "Việt", "Đường",
+            "(2024)", "x+y=z;", "•", "—", "中文", "\t", "\n\n", "   ",
+        ]  # fmt: skip
+        rng = random.Random(0)
+        pages = [" ".join(rng.choices(words, k=600)) for _ in range(num_pages)]
+    return pages
+
+
+def _time(fn: Callable[[str], str], pages: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_normalizer(
+    input_files: List[str], num_pages: int = 2000, repeat: int = 5
+) -> dict:
+    pages = _load_pages(input_files, num_pages)
+    for page in pages:
+        assert _legacy_filter_text(page) == LocalDataIngestion._filter_text(page)
+    num_chars = sum(len(page) for page in pages)
+    legacy = _time(_legacy_filter_text, pages, repeat)
+    current = _time(LocalDataIngestion._filter_text, pages, repeat)
+    return {
+        "pages": len(pages),
+        "chars": num_chars,
+        "legacy_mb_per_s": num_chars / legacy / 1e6,
+        "current_mb_per_s": num_chars / current / 1e6,
+        "speedup": legacy / current,
+    }
+
+
+def benchmark_chunker(
+    input_files: List[str], num_pages: int = 2000, repeat: int = 5
+) -> dict:
+    setting = RAGSettings().ingestion
+    pages = [
+        LocalDataIngestion._filter_text(page)
+        for page in _load_pages(input_files, num_pages)
+    ]
+    documents = [Document(text=page) for page in pages if page]
+    splitters = {
+        "sentence": SentenceSplitter.from_defaults(
+            chunk_size=setting.chunk_size,
+            chunk_overlap=setting.chunk_overlap,
+            paragraph_separator=setting.paragraph_sep,
+            secondary_chunking_regex=setting.chunking_regex,
+        ),
+        "token": LocalTokenChunker(
+            tokenizer=AutoTokenizer.from_pretrained(setting.embed_llm),
+            chunk_size=setting.chunk_size,
+            chunk_overlap=setting.chunk_overlap,
+            chunking_regex=setting.chunking_regex,
+        ),
+    }
+    result = {"pages": len(documents)}
+    for name, splitter in splitters.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            nodes = splitter(documents)
+            best = min(best, time.perf_counter() - start)
+        result[f"{name}_pages_per_s"] = len(documents) / best
+        result[f"{name}_chunks"] = len(nodes)
+    result["speedup"] = result["token_pages_per_s"] / result["sentence_pages_per_s"]
+    return result
+
+
+def benchmark_embedding(
+    input_files: List[str],
+    dtypes: Tuple[str, ...] = ("float32", "bfloat16", "int8"),
+    threads: Tuple[int, ...] = (0,),
+    num_chunks: int = 256,
+    repeat: int = 3,
+) -> dict:
+    # Runs on CPU in-process, chunks/s and the cosine similarity of every
+    # embedding to its float32 embedding are reported per dtype and thread
+    # count (0 keeps the torch default), with the threads torch actually used.
+    setting = RAGSettings()
+    setting.ingestion.embed_device = "cpu"
+    setting.ingestion.embed_num_processes = 0
+    pages = [
+        LocalDataIngestion._filter_text(page)
+        for page in _load_pages(input_files, num_chunks)
+    ]
+    chunker = LocalTokenChunker(
+        tokenizer=AutoTokenizer.from_pretrained(setting.ingestion.embed_llm),
+        chunk_size=setting.ingestion.chunk_size,
+        chunk_overlap=setting.ingestion.chunk_overlap,
+    )
+    texts = [
+        node.get_content() for node in chunker([Document(text=p) for p in pages if p])
+    ][:num_chunks]
+    result = {"chunks": len(texts)}
+    baseline = None
+    default_threads = torch.get_num_threads()
+    for dtype in ["float32"] + [dtype for dtype in dtypes if dtype != "float32"]:
+        for num_threads in threads:
+            setting.ingestion.embed_dtype = dtype
+            setting.ingestion.embed_num_threads = num_threads
+            # Thread counts stay set, a 0 after another count gets the default.
+            torch.set_num_threads(default_threads)
+            embed_model = LocalEmbedding.set(setting)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                embeddings = np.asarray(
+                    embed_model.get_text_embedding_batch(texts), dtype=np.float32
+                )
+                best = min(best, time.perf_counter() - start)
+            if baseline is None:
+                baseline = embeddings
+            cosine = np.sum(embeddings * baseline, axis=1) / (
+                np.linalg.norm(embeddings, axis=1) * np.linalg.norm(baseline, axis=1)
+            )
+            result[f"{dtype}_{num_threads}_threads"] = {
+                "threads": torch.get_num_threads(),
+                "chunks_per_s": len(texts) / best,
+                "mean_cosine": float(cosine.mean()),
+                "min_cosine": float(cosine.min()),
+            }
+    torch.set_num_threads(default_threads)
+    return result
+
+
+def benchmark_batching(
+    input_files: List[str], batch_tokens: int = 4096, repeat: int = 3
+) -> dict:
+    # Fixed embed_batch_size batches against length-bucketed batches under a
+    # token budget, on the chunks of the given corpus.
+    setting = RAGSettings()
+    pages = [
+        LocalDataIngestion._filter_text(page) for page in _load_pages(input_files, 200)
+    ]
+    embed_model = LocalEmbedding.set(setting)
+    tokenizer = AutoTokenizer.from_pretrained(setting.ingestion.embed_llm)
+    chunker = LocalTokenChunker(
+        tokenizer=tokenizer,
+        chunk_size=min(
+            setting.ingestion.chunk_size,
+            embed_model.max_length - tokenizer.num_special_tokens_to_add(),
+        ),
+        chunk_overlap=setting.ingestion.chunk_overlap,
+        chunking_regex=setting.ingestion.chunking_regex,
+    )
+    texts = [
+        node.get_content() for node in chunker([Document(text=p) for p in pages if p])
+    ]
+    result = {"chunks": len(texts)}
+    outputs = {}
+    for name, tokens in [("fixed", 0), ("bucketed", batch_tokens)]:
+        embed_model.embed_batch_tokens = tokens
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = np.asarray(
+                embed_model.get_text_embedding_batch(texts), dtype=np.float32
+            )
+            best = min(best, time.perf_counter() - start)
+        result[f"{name}_chunks_per_s"] = len(texts) / best
+    result["speedup"] = result["bucketed_chunks_per_s"] / result["fixed_chunks_per_s"]
+    result["max_abs_diff"] = float(np.abs(outputs["fixed"] - outputs["bucketed"]).max())
+    return result
+
+
+def benchmark_vector_store(
+    sizes: Tuple[int, ...] = (10_000, 100_000, 1_000_000),
+    dim: int = 1024,
+    num_queries: int = 16,
+    top_k: int = 20,
+    max_baseline: int = 100_000,
+    repeat: int = 3,
+) -> dict:
+    # Random unit vectors, query latency of the default SimpleVectorStore
+    # against LocalArrayVectorStore one query at a time and as one batch. The
+    # baseline keeps Python lists, it is skipped above max_baseline chunks.
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((num_queries, dim), dtype=np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    vector_queries = [
+        VectorStoreQuery(query_embedding=query.tolist(), similarity_top_k=top_k)
+        for query in queries
+    ]
+    result = {}
+    for size in sizes:
+        store = LocalArrayVectorStore()
+        ids = [str(idx) for idx in range(size)]
+        for start in range(0, size, 1 << 16):
+            stop = min(size, start + (1 << 16))
+            store.add_embeddings(
+                ids[start:stop], rng.standard_normal((stop - start, dim), np.float32)
+            )
+        timings = {}
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            array_results = [store.query(query) for query in vector_queries]
+            best = min(best, time.perf_counter() - start)
+        timings["array_ms"] = best / num_queries * 1000
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            store.query_batch(vector_queries)
+            best = min(best, time.perf_counter() - start)
+        timings["array_batch_ms"] = best / num_queries * 1000
+        if size <= max_baseline:
+            baseline = SimpleVectorStore(
+                data=SimpleVectorStoreData(
+                    embedding_dict=dict(zip(ids, store.matrix.tolist()))
+                )
+            )
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                baseline_results = [baseline.query(query) for query in vector_queries]
+                best = min(best, time.perf_counter() - start)
+            timings["simple_ms"] = best / num_queries * 1000
+            timings["speedup"] = timings["simple_ms"] / timings["array_ms"]
+            timings["same_top1"] = all(
+                a.ids[0] == b.ids[0] for a, b in zip(array_results, baseline_results)
+            )
+        timings["matrix_mb"] = store.nbytes / 1e6
+        result[size] = timings
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--type",
+        type=str,
+        default="normalizer",
+        choices=["normalizer", "chunker", "embedding", "batching", "vector_store"],
+        help="Set component to benchmark",
+    )
+    parser.add_argument(
+        "--input",
+        type=str,
+        nargs="*",
+        default=[],
+        help="Set documents used as corpus",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Set number of timed runs, the best one is reported",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="*",
+        default=[0],
+        help="Set CPU thread counts for the embedding benchmark, 0 for the default",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="*",
+        default=[10_000, 100_000, 1_000_000],
+        help="Set corpus sizes for the vector store benchmark",
+    )
+    parser.add_argument(
+        "--dim",
+        type=int,
+        default=1024,
+        help="Set embedding dimensions for the vector store benchmark",
+    )
+    args = parser.parse_args()
+    if args.type == "normalizer":
+        print(benchmark_normalizer(args.input, repeat=args.repeat))
+    elif args.type == "chunker":
+        print(benchmark_chunker(args.input, repeat=args.repeat))
+    elif args.type == "embedding":
+        print(
+            benchmark_embedding(
+                args.input, threads=tuple(args.threads), repeat=args.repeat
+            )
+        )
+    elif args.type == "batching":
+        print(benchmark_batching(args.input, repeat=args.repeat))
+    elif args.type == "vector_store":
+        print(benchmark_vector_store(args.sizes, dim=args.dim, repeat=args.repeat))
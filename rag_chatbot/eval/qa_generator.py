@@ -6,11 +6,10 @@ from typing import List
 from tqdm import tqdm
 from llama_index.core.llms.utils import LLM
 from llama_index.core.schema import MetadataMode, TextNode
-from llama_index.core.storage.docstore import DocumentStore
 from llama_index.core.evaluation import EmbeddingQAFinetuneDataset
 from ..core.model import LocalRAGModel
 from ..core.embedding import LocalEmbedding
-from ..core.ingestion import LocalDataIngestion
+from ..core.ingestion import LocalDataIngestion, LocalNodeExport
 from ..setting import RAGSettings
 
 
@@ -93,10 +92,14 @@ class QAGenerator:
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        if os.path.exists(os.path.join(output_dir, "docstore.json")):
-            print("Docstore already exist! Skip ingestion.")
+        if LocalNodeExport.exists(output_dir):
+            print("Export already exist! Skip ingestion.")
 
-        nodes = self._ingestion.store_nodes(input_files, embed_nodes=True)
+        nodes = self._ingestion.store_nodes(
+            input_files, embed_nodes=True, embed_model=self._embed_model
+        )
+        # Saved with their embeddings, so the evaluation never embeds them again.
+        self._ingestion.export_nodes(output_dir, self._embed_model)
         random.shuffle(nodes)
         dataset = generate_question_context_pairs(
             nodes=nodes[:max_nodes],
@@ -106,8 +109,3 @@ class QAGenerator:
 
         # save dataset
         dataset.save_json(os.path.join(output_dir, "dataset.json"))
-
-        # save nodes
-        docstore = DocumentStore()
-        docstore.add_documents(nodes)
-        docstore.persist(persist_path=os.path.join(output_dir, "docstore.json"))
@@ -1,11 +1,13 @@
 from .core import (
     LocalChatEngine,
     LocalDataIngestion,
+    LocalIngestionQueue,
     LocalRAGModel,
     LocalEmbedding,
-    LocalVectorStore,
+    LocalRerankerRegistry,
     get_system_prompt,
 )
+from .setting import RAGSettings
 from llama_index.core import Settings
 from llama_index.core.chat_engine.types import StreamingAgentChatResponse
 from llama_index.core.prompts import ChatMessage, MessageRole
@@ -21,9 +23,19 @@ class LocalRAGPipeline:
         self._default_model = LocalRAGModel.set(self._model_name, host=host)
         self._query_engine = None
         self._ingestion = LocalDataIngestion()
-        self._vector_store = LocalVectorStore(host=host)
+        self._ingestion_queue = LocalIngestionQueue(self._ingestion)
         Settings.llm = LocalRAGModel.set(host=host)
-        Settings.embed_model = LocalEmbedding.set(host=host)
+        Settings.embed_model = LocalEmbedding.set(host=host, cache_queries=True)
+        setting = RAGSettings()
+        if setting.retriever.rerank_preload:
+            LocalRerankerRegistry.get(
+                setting.retriever.rerank_llm, setting.retriever.rerank_device
+            )
+            if setting.retriever.rerank_cascade == "cross_encoder":
+                LocalRerankerRegistry.get(
+                    setting.retriever.rerank_cascade_model,
+                    setting.retriever.rerank_device,
+                )
 
     def get_model_name(self):
         return self._model_name
@@ -71,7 +83,9 @@ class LocalRAGPipeline:
         )
 
     def set_embed_model(self, model_name: str):
-        Settings.embed_model = LocalEmbedding.set(model_name, self._host)
+        Settings.embed_model = LocalEmbedding.set(
+            model_name=model_name, host=self._host, cache_queries=True
+        )
 
     def pull_model(self, model_name: str):
         return LocalRAGModel.pull(self._host, model_name)
@@ -88,6 +102,14 @@ class LocalRAGPipeline:
     def store_nodes(self, input_files: list[str] = None) -> None:
         self._ingestion.store_nodes(input_files=input_files)
 
+    def submit_documents(
+        self, input_files: list[str], document_ids: list[str] | None = None
+    ) -> str:
+        return self._ingestion_queue.submit(input_files, document_ids)
+
+    def get_ingestion_job(self, job_id: str):
+        return self._ingestion_queue.get_job(job_id)
+
     def set_chat_mode(self, system_prompt: str | None = None):
         self.set_language(self._language)
         self.set_system_prompt(system_prompt)
@@ -95,10 +117,26 @@ class LocalRAGPipeline:
         self.set_engine()
 
     def set_engine(self):
+        nodes, embeddings = self._ingestion.get_ingested_nodes_with_embeddings()
         self._query_engine = self._engine.set_engine(
             llm=self._default_model,
-            nodes=self._ingestion.get_ingested_nodes(),
+            nodes=nodes,
+            language=self._language,
+            embeddings=embeddings,
+        )
+
+    def set_corpus(self):
+        """Make the documents ingested so far queryable, keeping the engine."""
+        if self._query_engine is None:
+            self.set_engine()
+            return
+        nodes, embeddings = self._ingestion.get_ingested_nodes_with_embeddings()
+        self._query_engine = self._engine.set_corpus(
+            self._query_engine,
+            llm=self._default_model,
+            nodes=nodes,
             language=self._language,
+            embeddings=embeddings,
         )
 
     def get_history(self, chatbot: list[list[str]]):
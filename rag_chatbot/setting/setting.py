@@ -27,7 +27,36 @@ class RetrieverSettings(BaseModel):
     rerank_llm: str = Field(
         default="BAAI/bge-reranker-large", description="Rerank LLM model"
     )
+    rerank_device: str = Field(
+        default="auto", description="Rerank device: auto, cpu, cuda or mps"
+    )
+    rerank_batch_size: int = Field(
+        default=32, description="Query and node pairs scored per rerank batch"
+    )
+    rerank_preload: bool = Field(
+        default=False, description="Load the rerank model when the pipeline starts"
+    )
+    rerank_cache_size: int = Field(
+        default=4096, description="Cached rerank pair scores, 0 disables the cache"
+    )
+    rerank_cascade: str = Field(
+        default="none",
+        description="First rerank stage: none, cross_encoder or embedding",
+    )
+    rerank_cascade_model: str = Field(
+        default="cross-encoder/ms-marco-MiniLM-L-6-v2",
+        description="Small cross-encoder of the cross_encoder first rerank stage",
+    )
+    rerank_cascade_top_k: int = Field(
+        default=12, description="Candidates the first rerank stage passes on"
+    )
+    rerank_cascade_audit_rate: float = Field(
+        default=0.0, description="Share of queries fully reranked to measure recall"
+    )
     fusion_mode: str = Field(default="dist_based_score", description="Fusion mode")
+    query_cache_size: int = Field(
+        default=1024, description="Cached query embeddings, 0 disables the cache"
+    )
 
 
 class IngestionSettings(BaseModel):
@@ -35,6 +64,39 @@ class IngestionSettings(BaseModel):
         default="BAAI/bge-large-en-v1.5", description="Embedding LLM model"
     )
     embed_batch_size: int = Field(default=8, description="Embedding batch size")
+    embed_batch_tokens: int = Field(
+        default=4096,
+        description="Padded tokens per embedding batch, 0 uses embed_batch_size",
+    )
+    embed_device: str = Field(
+        default="auto", description="Embedding device: auto, cpu, cuda or mps"
+    )
+    embed_dtype: str = Field(
+        default="auto",
+        description="Embedding dtype: auto, float32, bfloat16, float16 or int8",
+    )
+    embed_num_threads: int = Field(
+        default=0,
+        description=(
+            "CPU threads for embedding in-process or per worker process, 0 keeps "
+            "the torch default in-process and splits the cores between workers"
+        ),
+    )
+    embed_num_processes: int = Field(
+        default=0, description="Embedding worker processes on CPU, 0 or 1 for none"
+    )
+    embed_memory_budget: int = Field(
+        default=4096, description="Memory of loaded embedding models in MB"
+    )
+    embed_server_url: str = Field(
+        default="", description="Embedding server URL, empty to embed in-process"
+    )
+    embed_server_batch_size: int = Field(
+        default=64, description="Texts per embedding server micro-batch"
+    )
+    embed_server_max_wait_ms: float = Field(
+        default=5.0, description="Time the embedding server waits to fill a batch"
+    )
     cache_folder: str = Field(default="data/huggingface", description="Cache folder")
     chunk_size: int = Field(default=512, description="Document chunk size")
     chunk_overlap: int = Field(default=32, description="Document chunk overlap")
@@ -42,6 +104,9 @@ class IngestionSettings(BaseModel):
         default="[^,.;。？！]+[,.;。？！]?", description="Chunking regex"
     )
     paragraph_sep: str = Field(default="\n \n", description="Paragraph separator")
+    page_batch_size: int = Field(
+        default=32, description="Pages parsed, split and embedded per batch"
+    )
     num_workers: int = Field(default=0, description="Number of workers")
 
 
@@ -53,6 +118,19 @@ class StorageSettings(BaseModel):
         default="data/storage", description="Storage directory"
     )
     collection_name: str = Field(default="collection", description="Collection name")
+    vector_store: str = Field(
+        default="chroma",
+        description="Vector store: chroma (persistent ANN) or array (exact)",
+    )
+    vector_dtype: str = Field(
+        default="float32", description="Stored embedding dtype: float32 or float16"
+    )
+    vector_dim: int = Field(
+        default=0, description="Stored embedding dimensions, 0 keeps all"
+    )
+    vector_reduction: str = Field(
+        default="truncate", description="Dimension reduction: truncate or pca"
+    )
     port: int = Field(default=8000, description="Port number")
 
 
@@ -1,2 +1,207 @@
+import os
+import numpy as np
+import pytest
+from llama_index.core.embeddings import MockEmbedding
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores.types import (
+    FilterCondition,
+    FilterOperator,
+    MetadataFilter,
+    MetadataFilters,
+    VectorStoreQuery,
+)
+from llama_index.retrievers.bm25.base import tokenize_remove_stopwords
+from rank_bm25 import BM25Okapi
+from rag_chatbot.core.ingestion import LocalDataIngestion
+from rag_chatbot.core.vector_store import LocalArrayVectorStore, LocalBM25Index
+from rag_chatbot.setting import RAGSettings
+
+
 def test():
     pass
+
+
+def test_filter_text_golden():
+    # Outputs of the original three-pass filter (findall, join, \s+ collapse).
+    golden = {
+        "": "",
+        "   ": "",
+        "Hello, world!": "Hello, world!",
+        "  Leading and trailing spaces  ": "Leading and trailing spaces",
+        "Line one\nLine two\r\nLine three": "Line one Line two Line three",
+        "Tabs\tand\xa0non-breaking spaces": "Tabs and non-breaking spaces",
+        "Tiếng Việt có dấu: Đường, Ưu tiên, Ạ ỹ": (
+            "Tiếng Việt có dấu: Đường, Ưu tiên, Ạ ỹ"
+        ),
+        "Bullets • and — dashes – 中文 \U0001f600 symbols": (
+            "Bullets and dashes symbols"
+        ),
+        "Math: a+b=c; [x]{y}|z\\w <tag/> ?!": "Math: a+b=c; [x]{y}|z\\w <tag/> ?!",
+        "multiple     spaces\n\n\nand blank lines": "multiple spaces and blank lines",
+        "Ñandú Ǿ ǿ Ɐ": "Ñandú",
+    }
+    for text, expected in golden.items():
+        assert LocalDataIngestion._filter_text(text) == expected
+
+
+def test_store_nodes_same_file_name(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_files = []
+    for folder, text in [("a", "Apples are red."), ("b", "Pears are green.")]:
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "report.txt").write_text(text)
+        input_files.append(str(tmp_path / folder / "report.txt"))
+    ingestion = LocalDataIngestion()
+
+    # Two files sharing a basename are two documents.
+    nodes = ingestion.store_nodes(input_files, embed_nodes=False)
+    assert [node.get_content() for node in nodes] == [
+        "Apples are red.",
+        "Pears are green.",
+    ]
+    assert all(node.metadata["file_name"] == "report.txt" for node in nodes)
+    assert len({node.node_id for node in nodes}) == len(nodes)
+
+    # Under one document id the later file is the version that is kept.
+    nodes = ingestion.store_nodes(
+        input_files, embed_nodes=False, document_ids=["report", "report"]
+    )
+    assert [node.get_content() for node in nodes] == ["Pears are green."]
+    nodes = ingestion.store_nodes(input_files[:1], embed_nodes=False)
+    assert [node.get_content() for node in nodes] == ["Apples are red."]
+
+
+def test_store_nodes_edited_upload(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    setting = RAGSettings()
+    setting.ingestion.chunk_size = 64
+    setting.ingestion.chunk_overlap = 0
+    ingestion = LocalDataIngestion(setting)
+    embed_model = MockEmbedding(embed_dim=8)
+    lines = [f"Sentence {idx} is about topic number {idx * 7}.\n" for idx in range(200)]
+    node_ids = []
+    # Uploads of each version land in a directory of their own, like gradio's.
+    for upload, last_line in [("v1", lines[-1]), ("v2", "The last line changed.\n")]:
+        (tmp_path / upload).mkdir()
+        input_file = tmp_path / upload / "manual.txt"
+        input_file.write_text("".join(lines[:-1] + [last_line]))
+        nodes = ingestion.store_nodes(
+            [str(input_file)], embed_model=embed_model, document_ids=["manual.txt"]
+        )
+        node_ids.append([node.node_id for node in nodes])
+
+    # Unchanged chunks keep their ids and embeddings, the old version is gone.
+    assert node_ids[0] != node_ids[1]
+    assert len(set(node_ids[0]) & set(node_ids[1])) >= len(node_ids[0]) - 2
+    assert len(ingestion._persist_store.keys()) == 1
+
+
+def test_import_nodes_keeps_documents_apart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    input_files = []
+    for folder, text in [("x", "Apples are red."), ("y", "Pears are green.")]:
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "r.txt").write_text(text)
+        input_files.append(str(tmp_path / folder / "r.txt"))
+    embed_model = MockEmbedding(embed_dim=8)
+    ingestion = LocalDataIngestion()
+    ingestion.store_nodes(input_files, embed_model=embed_model)
+    ingestion.export_nodes(str(tmp_path / "export"), embed_model)
+
+    # Both r.txt files come back as their own documents.
+    imported = LocalDataIngestion()
+    nodes = imported.import_nodes(str(tmp_path / "export"), embed_model)
+    assert [node.get_content() for node in nodes] == [
+        "Apples are red.",
+        "Pears are green.",
+    ]
+    assert [node.ref_doc_id for node in nodes] == [
+        os.path.abspath(input_file) for input_file in input_files
+    ]
+    assert imported.get_ingested_nodes_with_embeddings()[1].shape == (2, 8)
+
+
+def test_array_store_filter_masks():
+    store = LocalArrayVectorStore()
+    store.add_embeddings(
+        ["a1", "a2", "b1", "c"],
+        np.eye(4, dtype=np.float32),
+        metadata=[
+            {"file_name": "a.txt", "page": 1, "tags": ["x", "y"]},
+            {"file_name": "a.txt", "page": 2, "tags": ["y", "z"]},
+            {"file_name": "b.txt", "page": 1, "tags": ["x", "y"]},
+            {"file_name": "c.txt"},
+        ],
+    )
+
+    def query(*filters, condition=FilterCondition.AND):
+        result = store.query(
+            VectorStoreQuery(
+                query_embedding=[1.0, 1.0, 1.0, 1.0],
+                similarity_top_k=4,
+                filters=MetadataFilters(filters=list(filters), condition=condition),
+            )
+        )
+        return sorted(result.ids)
+
+    def where(key, value, operator=FilterOperator.EQ):
+        return MetadataFilter(key=key, value=value, operator=operator)
+
+    assert query(where("file_name", "a.txt")) == ["a1", "a2"]
+    assert query(where("file_name", "a.txt", FilterOperator.NE)) == ["b1", "c"]
+    assert query(where("page", 1)) == ["a1", "b1"]
+    assert query(where("file_name", ["a.txt", "c.txt"], FilterOperator.IN)) == [
+        "a1",
+        "a2",
+        "c",
+    ]
+    assert query(where("page", [1, 2], FilterOperator.NIN)) == ["c"]
+    assert query(where("file_name", "a.txt"), where("page", 1)) == ["a1"]
+    assert query(
+        where("file_name", "c.txt"),
+        MetadataFilters(filters=[where("file_name", "b.txt"), where("page", 2)]),
+        condition=FilterCondition.OR,
+    ) == ["c"]
+    assert query(
+        where("file_name", "c.txt"),
+        MetadataFilters(
+            filters=[where("file_name", "b.txt"), where("page", 2)],
+            condition=FilterCondition.OR,
+        ),
+        condition=FilterCondition.OR,
+    ) == ["a2", "b1", "c"]
+    # Equal-length list values stay one value per row, matched as a whole.
+    assert query(where("tags", ["x", "y"])) == ["a1", "b1"]
+    assert query(where("tags", ["x", "y"], FilterOperator.NE)) == ["a2", "c"]
+
+
+def test_bm25_scores_match_rank_bm25(tmp_path):
+    texts = [
+        "The cat sat on the mat with another cat.",
+        "Dogs chase cats around the garden.",
+        "A garden full of flowers and bees.",
+        "Bees make honey from the flowers in the garden.",
+        "The mat was red, the cat was black.",
+        "Nothing here matches at all.",
+    ]
+    nodes = [TextNode(id_=f"n{idx}", text=text) for idx, text in enumerate(texts)]
+    index = LocalBM25Index(str(tmp_path / "bm25"))
+
+    def check(nodes, query):
+        okapi = BM25Okapi([tokenize_remove_stopwords(node.text) for node in nodes])
+        expected = okapi.get_scores(tokenize_remove_stopwords(query))
+        scores = {node.node_id: score for node, score in index.query(query, 100)}
+        assert [scores[node.node_id] for node in nodes] == pytest.approx(
+            expected.tolist(), rel=1e-5, abs=1e-6
+        )
+
+    index.sync(nodes)
+    for query in ["cat on the mat", "garden bees", "flowers flowers honey", "zebra"]:
+        check(nodes, query)
+    # Deleted and added nodes, and an index loaded from disk, score the same.
+    nodes = nodes[1:] + [TextNode(id_="n6", text="A cat in the garden.")]
+    index.sync(nodes)
+    check(nodes, "cat garden")
+    index = LocalBM25Index(str(tmp_path / "bm25"))
+    index.sync(nodes)
+    check(nodes, "cat garden")
@@ -8,6 +8,7 @@ from dataclasses import dataclass
 from typing import ClassVar
 from llama_index.core.chat_engine.types import StreamingAgentChatResponse
 from .theme import JS_LIGHT_THEME, CSS
+from ..core.ingestion.reader import get_supported_extensions
 from ..pipeline import LocalRAGPipeline
 from ..logger import Logger
 
@@ -27,7 +28,9 @@ class DefaultElement:
     PULL_MODEL_SCUCCESS_STATUS: str = "Pulling model 🤖 completed!"
     PULL_MODEL_FAIL_STATUS: str = "Pulling model 🤖 failed!"
     MODEL_NOT_EXIST_STATUS: str = "Model doesn't exist!"
+    PROCESS_DOCUMENT_STATUS: str = "Processing documents 📄"
     PROCESS_DOCUMENT_SUCCESS_STATUS: str = "Processing documents 📄 completed!"
+    PROCESS_DOCUMENT_FAIL_STATUS: str = "Processing documents 📄 failed!"
     PROCESS_DOCUMENT_EMPTY_STATUS: str = "Empty documents!"
     ANSWERING_STATUS: str = "Answering!"
     COMPLETED_STATUS: str = "Completed!"
@@ -200,22 +203,55 @@ class LocalChatbotUI:
         visible = False if document in [None, []] else True
         return (gr.update(visible=visible), gr.update(visible=visible))
 
-    def _processing_document(
-        self, document: list[str], progress=gr.Progress(track_tqdm=True)
-    ):
+    def _processing_document(self, document: list[str]):
         document = document or []
+        # Gradio saves every upload under a directory named after its content,
+        # an edited file would arrive under a new path. Documents are
+        # identified by their name in the data directory instead, so an edit
+        # is a new version of the same document.
+        document_ids = [
+            os.path.join(self._data_dir, file_path.split("/")[-1])
+            for file_path in document
+        ]
         if self._host == "host.docker.internal":
-            input_files = []
-            for file_path in document:
-                dest = os.path.join(self._data_dir, file_path.split("/")[-1])
+            for file_path, dest in zip(document, document_ids):
                 shutil.move(src=file_path, dst=dest)
-                input_files.append(dest)
-            self._pipeline.store_nodes(input_files=input_files)
+            input_files = document_ids
         else:
-            self._pipeline.store_nodes(input_files=document)
-        self._pipeline.set_chat_mode()
-        gr.Info("Processing Completed!")
-        return (self._pipeline.get_system_prompt(), DefaultElement.COMPLETED_STATUS)
+            input_files = document
+        job_id = self._pipeline.submit_documents(input_files, document_ids)
+        # The session polling the job keeps its id and files done.
+        return (gr.update(), DefaultElement.PROCESS_DOCUMENT_STATUS, (job_id, 0))
+
+    def _check_ingestion(self, ingestion_job: tuple | None):
+        job = (
+            self._pipeline.get_ingestion_job(ingestion_job[0])
+            if ingestion_job is not None
+            else None
+        )
+        if job is None:
+            return (gr.update(), gr.update(), None)
+        job_id, job_done = ingestion_job
+        num_done = job.num_done
+        if job.finished:
+            # The chat engine and its prompt are rebuilt once, for all files.
+            self._pipeline.set_chat_mode()
+            if job.failed:
+                gr.Warning(f"Processing failed: {job.error}")
+                status = DefaultElement.PROCESS_DOCUMENT_FAIL_STATUS
+            else:
+                gr.Info("Processing Completed!")
+                status = DefaultElement.COMPLETED_STATUS
+            return (self._pipeline.get_system_prompt(), status, None)
+        status = "{} {}/{}".format(
+            DefaultElement.PROCESS_DOCUMENT_STATUS, num_done, len(job.files)
+        )
+        if num_done == job_done:
+            return (gr.update(), status, ingestion_job)
+        # Make the documents ingested so far queryable while the rest are
+        # still being processed, only the retriever's corpus changes.
+        self._pipeline.set_corpus()
+        return (gr.update(), status, (job_id, num_done))
 
     def _change_system_prompt(self, sys_prompt: str):
         self._pipeline.set_system_prompt(sys_prompt)
@@ -262,6 +298,8 @@ class LocalChatbotUI:
             yield m
 
     def build(self):
+        # Every format the ingestion has a reader for can be uploaded.
+        file_types = get_supported_extensions()
         with gr.Blocks(
             theme=gr.themes.Soft(primary_hue="slate"),
             js=JS_LIGHT_THEME,
@@ -270,6 +308,8 @@ class LocalChatbotUI:
             gr.Markdown("## Local RAG Chatbot 🤖")
             with gr.Tab("Interface"):
                 sidebar_state = gr.State(True)
+                # Per browser session, every session polls its own upload.
+                ingestion_job = gr.State(None)
                 with gr.Row(variant=self._variant, equal_height=False):
                     with gr.Column(
                         variant=self._variant, scale=10, visible=sidebar_state.value
@@ -304,7 +344,7 @@ class LocalChatbotUI:
                             documents = gr.Files(
                                 label="Add Documents",
                                 value=[],
-                                file_types=[".txt", ".pdf", ".csv"],
+                                file_types=file_types,
                                 file_count="multiple",
                                 height=150,
                                 interactive=True,
@@ -313,7 +353,7 @@ class LocalChatbotUI:
                                 upload_doc_btn = gr.UploadButton(
                                     label="Upload",
                                     value=[],
-                                    file_types=[".txt", ".pdf", ".csv"],
+                                    file_types=file_types,
                                     file_count="multiple",
                                     min_width=20,
                                     visible=False,
@@ -345,7 +385,7 @@ class LocalChatbotUI:
                             message = gr.MultimodalTextbox(
                                 value=DefaultElement.DEFAULT_MESSAGE,
                                 placeholder="Enter you message:",
-                                file_types=[".txt", ".pdf", ".csv"],
+                                file_types=file_types,
                                 show_label=False,
                                 scale=6,
                                 lines=1,
@@ -419,7 +459,7 @@ class LocalChatbotUI:
             documents.change(
                 self._processing_document,
                 inputs=[documents],
-                outputs=[system_prompt, status],
+                outputs=[system_prompt, status, ingestion_job],
             ).then(
                 self._show_document_btn,
                 inputs=[documents],
@@ -441,5 +481,12 @@ class LocalChatbotUI:
                 self._reset_document, outputs=[documents, upload_doc_btn, reset_doc_btn]
             )
             demo.load(self._welcome, outputs=[message, chatbot, status])
+            demo.load(
+                self._check_ingestion,
+                inputs=[ingestion_job],
+                outputs=[system_prompt, status, ingestion_job],
+                every=1,
+                show_progress="hidden",
+            )
 
         return demo